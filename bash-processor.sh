@@ -2,4 +2,4 @@
 
 BASE_DIR=$( cd "$( dirname "${BASH_SOURCE[0]}" )" && pwd )
 
-/usr/bin/env python3 $BASE_DIR/src/anniversary-processor.py bash
+/usr/bin/env python3 $BASE_DIR/src/launcher.py bash
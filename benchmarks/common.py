@@ -0,0 +1,67 @@
+"""Helpers shared by the benchmark scripts."""
+
+import importlib.util
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BASE_DIR, "src")
+
+
+################################################################################
+def load_processor_module():
+    """Imports src/anniversary-processor.py (the name is not importable as is)."""
+
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+    spec = importlib.util.spec_from_file_location(
+        "anniversary_processor", os.path.join(SRC_DIR, "anniversary-processor.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+################################################################################
+def make_processor(cls, entries, **attributes):
+    """Creates a processor working on the given Anniversary records.
+
+    No config files are read; attributes are set on the processor as given.
+    """
+
+    processor = cls.__new__(cls)
+    processor.entries = entries
+    processor._prepare_data()
+    for name, value in attributes.items():
+        setattr(processor, name, value)
+
+    return processor
+
+
+################################################################################
+def synthetic_anniversaries(module, per_day, year=2026, styles=10):
+    """per_day anniversaries on every day of the year, spread over some styles."""
+
+    styles = [
+        module.Style("*", "#000000", "#ccff{:02x}".format(i)) for i in range(styles)
+    ]
+
+    entries = []
+    date = module.datetime.date(year, 1, 1)
+    while date.year == year:
+        for i in range(per_day):
+            entries.append(
+                module.Anniversary(
+                    "section {}".format(i % len(styles)),
+                    "Person {}-{}".format(date.isoformat(), i),
+                    styles[i % len(styles)],
+                    1950 + i % 60 if i % 3 else None,
+                    date.month,
+                    date.day,
+                )
+            )
+        date += module.datetime.timedelta(1)
+
+    return entries
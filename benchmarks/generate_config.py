@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Writes a synthetic monthly.cfg/yearly.cfg pair with the given number of
+anniversaries.
+
+The dates are skewed like real data: a few days of the year (and a few
+sections) get most of the anniversaries, some years are unknown (????/xxxx)
+and there are leap days. The output is the same for the same seed.
+
+Usage: generate_config.py DIR [number of anniversaries] [skew] [seed]
+"""
+
+import datetime
+import itertools
+import os
+import random
+import sys
+
+# share of the anniversaries written to monthly.cfg
+MONTHLY_SHARE = 0.05
+
+
+################################################################################
+def zipf_weights(count, skew):
+    """Weights of a Zipf distribution – the first item is the most frequent."""
+
+    return [1 / rank**skew for rank in range(1, count + 1)]
+
+
+################################################################################
+def generate(config_dir, count, skew=1.0, seed=42, sections=20):
+    """Writes monthly.cfg and yearly.cfg with count anniversaries to config_dir."""
+
+    rng = random.Random(seed)
+
+    # every day of a leap year, in random order of popularity
+    days = []
+    date = datetime.date(2024, 1, 1)
+    while date.year == 2024:
+        days.append((date.month, date.day))
+        date += datetime.timedelta(1)
+    rng.shuffle(days)
+    day_weights = list(itertools.accumulate(zipf_weights(len(days), skew)))
+
+    section_weights = list(itertools.accumulate(zipf_weights(sections, skew)))
+    month_days = list(range(1, 32))
+    rng.shuffle(month_days)
+    month_day_weights = list(itertools.accumulate(zipf_weights(31, skew)))
+
+    monthly = int(count * MONTHLY_SHARE)
+    yearly = count - monthly
+
+    os.makedirs(config_dir, exist_ok=True)
+
+    # group by section: the options of a section have to be consecutive
+    yearly_sections = [[] for _ in range(sections)]
+    for number in range(yearly):
+        section = rng.choices(range(sections), cum_weights=section_weights)[0]
+        month, day = rng.choices(days, cum_weights=day_weights)[0]
+        year = rng.choice(["????", "xxxx"]) if rng.random() < 0.1 else None
+        if year is None:
+            # leap days need a leap year
+            year = rng.randrange(1924, 2024, 4 if (month, day) == (2, 29) else 1)
+        yearly_sections[section].append(
+            "Person {} = {}-{:02d}-{:02d}".format(number, year, month, day)
+        )
+    write_config(os.path.join(config_dir, "yearly.cfg"), yearly_sections, rng)
+
+    monthly_sections = [[] for _ in range(sections)]
+    for number in range(monthly):
+        section = rng.choices(range(sections), cum_weights=section_weights)[0]
+        day = rng.choices(month_days, cum_weights=month_day_weights)[0]
+        monthly_sections[section].append("payment {} = {:02d}".format(number, day))
+    write_config(os.path.join(config_dir, "monthly.cfg"), monthly_sections, rng)
+
+
+################################################################################
+def write_config(config_file, sections, rng):
+    with open(config_file, "w", encoding="utf-8") as fh:
+        for number, lines in enumerate(sections):
+            fh.write("[section {}]\n".format(number))
+            fh.write("symbol = {}\n".format("*†∞Π$#"[number % 6]))
+            fh.write("color = #000000\n")
+            fh.write("bgcolor = #{:06x}\n\n".format(rng.randrange(0x1000000)))
+            for line in lines:
+                fh.write(line)
+                fh.write("\n")
+            fh.write("\n")
+
+
+################################################################################
+if __name__ == "__main__":
+
+    if len(sys.argv) < 2:
+        sys.exit(__doc__.strip())
+
+    config_dir = sys.argv[1]
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    skew = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else 42
+
+    generate(config_dir, count, skew, seed)
+    print("Wrote {} anniversaries to {}".format(count, config_dir))
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Compares the memory used by the anniversary records with the old dict layout.
+
+The old layout stored a fresh dict (symbol, data, color, bgcolor) for every
+entry and every year; now each entry is one Anniversary record sharing the
+Style of its section.
+
+Usage: memory_records.py [number of entries] [number of years]
+"""
+
+import random
+import sys
+import tracemalloc
+
+from common import load_processor_module
+
+
+################################################################################
+def synthetic_entries(count, sections=20):
+    random.seed(42)
+    for i in range(count):
+        section = i % sections
+        yield (
+            "section {}".format(section),
+            i,
+            ("*", "#000000", "#ccff{:02x}".format(section)),
+            random.choice([None, random.randint(1920, 2020)]),
+            random.randint(1, 12),
+            random.randint(1, 28),
+        )
+
+
+################################################################################
+def legacy_layout(entries, years):
+    data = dict()
+    for year in years:
+        for section, number, style, first_year, month, day in entries:
+            key = "{}-{:02d}-{:02d}".format(year, month, day)
+            entry = {
+                "symbol": style[0],
+                "data": "Person {}".format(number),
+                "color": style[1],
+                "bgcolor": style[2],
+            }
+            if first_year is not None:
+                entry["data"] += " ({})".format(year - first_year)
+            data.setdefault(key, []).append(entry)
+    return data
+
+
+################################################################################
+def record_layout(module, entries):
+    styles = dict()
+    records = []
+    for section, number, style, first_year, month, day in entries:
+        style = styles.setdefault(style, module.Style(*style))
+        records.append(
+            module.Anniversary(
+                sys.intern(section),
+                "Person {}".format(number),
+                style,
+                first_year,
+                month,
+                day,
+            )
+        )
+    return module.DateIndex(records)
+
+
+################################################################################
+def measure(func, *args):
+    tracemalloc.start()
+    result = func(*args)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak
+
+
+################################################################################
+if __name__ == "__main__":
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    years = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    module = load_processor_module()
+
+    entries = list(synthetic_entries(count))
+
+    legacy = measure(legacy_layout, entries, range(2026, 2026 + years))
+    records = measure(record_layout, module, entries)
+
+    print("{} entries, {} years".format(count, years))
+    print("{:>10}  {:>14}  {:>14}".format("layout", "retained [MB]", "peak [MB]"))
+    for name, (current, peak) in (("dicts", legacy), ("records", records)):
+        print(
+            "{:>10}  {:>14.1f}  {:>14.1f}".format(name, current / 2**20, peak / 2**20)
+        )
+    print("reduction: {:.1f}x".format(legacy[0] / records[0]))
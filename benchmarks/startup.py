@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Measures the start-up time of a shell mode – the time added to every new
+terminal – and checks it against a budget.
+
+Every variant is started --runs times as a new process on the config in etc/:
+the script without any cache, the script with the caches and src/launcher.py
+(cached bytecode) with the caches, as bash-processor.sh starts it. The median
+wall time of each is printed; the exit code is 1 if the launcher exceeds the
+budget.
+
+Usage: startup.py [--mode bash] [--runs 20] [--budget 0.1]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from common import BASE_DIR, SRC_DIR
+
+
+################################################################################
+def measure(command, runs):
+    """Returns the median wall time in seconds of the given command.
+
+    One run beforehand fills the caches and is not counted.
+    """
+
+    # the launcher is about the bytecode cache – do not let it be switched off
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+
+    times = []
+    for _ in range(runs + 1):
+        start = time.perf_counter()
+        subprocess.run(
+            command, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL, check=True
+        )
+        times.append(time.perf_counter() - start)
+
+    return statistics.median(times[1:])
+
+
+################################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--mode", default="bash", help="shell mode to start (default: bash)"
+    )
+    parser.add_argument("--runs", type=int, default=20, help="starts per variant")
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=0.1,
+        help="allowed seconds for the launcher with caches (default: 0.1)",
+    )
+    args = parser.parse_args()
+
+    script = os.path.join(SRC_DIR, "anniversary-processor.py")
+    launcher = os.path.join(SRC_DIR, "launcher.py")
+
+    variants = [
+        ("bare python", [sys.executable, "-c", ""]),
+        ("script, no cache", [sys.executable, script, args.mode, "--no-cache"]),
+        ("script, cached", [sys.executable, script, args.mode]),
+        ("launcher, cached", [sys.executable, launcher, args.mode]),
+    ]
+    for name, command in variants:
+        seconds = measure(command, args.runs)
+        print("{:<20} {:8.1f} ms".format(name, seconds * 1000))
+
+    if seconds > args.budget:
+        print()
+        print(
+            "The launcher needs {:.1f} ms, more than the budget of {:.1f} ms".format(
+                seconds * 1000, args.budget * 1000
+            )
+        )
+        sys.exit(1)
+
+    print()
+    print("Within the budget of {:.1f} ms".format(args.budget * 1000))
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""Measures time and peak memory of every processing stage for synthetic
+configs of growing size (see generate_config.py).
+
+The stages are: parsing the config, _prepare_data, ShellProcessor._build_lines,
+HtmlProcessor._create_html (a year), IcalProcessor._create_ical_events (a
+year, rendered) and the PDF of a year (only if WeasyPrint is installed and up
+to --pdf-max anniversaries).
+
+The time is the best of --repeat runs, the peak memory is taken in an extra
+run under tracemalloc. --engine selects the index of the anniversaries (see
+make_index() – "auto" depends on the size). With --save the results become the baseline; with
+--compare they are checked against it and the exit code is 1 if a stage got
+slower or needs more memory than allowed by the tolerances.
+
+Usage: suite.py [--sizes 10,1000,100000] [--engine auto] [--save | --compare]
+                [--baseline FILE]
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from common import BASE_DIR, load_processor_module, make_processor
+from generate_config import generate
+
+YEAR = 2026
+
+# differences below these are noise, whatever the tolerance says
+MIN_SECONDS = 0.005
+MIN_BYTES = 256 * 1024
+
+
+################################################################################
+def stage_parse(module, context):
+    processor = module.BaseProcessor.__new__(module.BaseProcessor)
+    processor.config_dir = context["config_dir"]
+
+    def run():
+        processor._readConfig()
+        processor._parse_entries()
+        context["entries"] = processor.entries
+
+    return run
+
+
+################################################################################
+def stage_prepare(module, context):
+    processor = module.BaseProcessor.__new__(module.BaseProcessor)
+    processor.entries = context["entries"]
+
+    return processor._prepare_data
+
+
+################################################################################
+def stage_shell(module, context):
+    today = datetime.date(YEAR, 6, 1)
+    processor = make_processor(
+        module.ShellProcessor,
+        context["entries"],
+        start=today - datetime.timedelta(7),
+        end=today + datetime.timedelta(30),
+    )
+
+    def run():
+        processor.lines = []
+        processor._build_lines()
+
+    return run
+
+
+################################################################################
+def stage_html(module, context):
+    processor = make_processor(
+        module.HtmlProcessor,
+        context["entries"],
+        template_dir=os.path.join(BASE_DIR, "templates"),
+        year=YEAR,
+    )
+    processor._read_template()
+
+    def run():
+        for processor.month in range(1, 13):
+            processor._create_html()
+
+    return run
+
+
+################################################################################
+def stage_ical(module, context):
+    processor = make_processor(
+        module.IcalProcessor,
+        context["entries"],
+        year=YEAR,
+        alarms=module.IcalProcessor.default_alarms,
+        snapshot=dict(),
+        new_snapshot=dict(),
+    )
+
+    def run():
+        events = processor._publish(str(YEAR), processor._create_ical_events())
+        "".join(processor._ical_chunks(events))
+
+    return run
+
+
+################################################################################
+def stage_pdf(module, context):
+    if importlib.util.find_spec("weasyprint") is None:
+        return None
+    if len(context["entries"]) > context["pdf_max"]:
+        return None
+
+    processor = make_processor(
+        module.HtmlProcessor,
+        context["entries"],
+        template_dir=os.path.join(BASE_DIR, "templates"),
+        year=YEAR,
+    )
+    processor._read_template()
+    processor._create_year_html()
+
+    pdf_dir = os.path.join(context["work_dir"], "pdf")
+    os.makedirs(pdf_dir, exist_ok=True)
+    pdf_files = [
+        os.path.join(pdf_dir, "{}-{:02d}.pdf".format(YEAR, month))
+        for month in range(1, 13)
+    ]
+
+    def run():
+        module.make_year_pdf_single_pass(
+            processor.html,
+            context["work_dir"],
+            pdf_files,
+            os.path.join(pdf_dir, "{}.pdf".format(YEAR)),
+        )
+
+    return run
+
+
+STAGES = [
+    ("parse", stage_parse),
+    ("prepare", stage_prepare),
+    ("shell", stage_shell),
+    ("html", stage_html),
+    ("ical", stage_ical),
+    ("pdf", stage_pdf),
+]
+
+
+################################################################################
+def measure(run, repeat):
+    """Returns (best seconds, peak bytes) of the given function."""
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+
+################################################################################
+def run_suite(module, sizes, repeat, skew, pdf_max):
+    """Returns size => stage => {"seconds": ..., "peak_bytes": ...}."""
+
+    results = dict()
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as work_dir:
+            config_dir = os.path.join(work_dir, "etc")
+            generate(config_dir, size, skew)
+
+            context = {
+                "config_dir": config_dir,
+                "work_dir": work_dir,
+                "pdf_max": pdf_max,
+            }
+            results[str(size)] = dict()
+            for name, stage in STAGES:
+                run = stage(module, context)
+                if run is None:
+                    print("{:>9} {:<8} skipped".format(size, name))
+                    continue
+
+                seconds, peak = measure(run, repeat)
+                results[str(size)][name] = {"seconds": seconds, "peak_bytes": peak}
+                print(
+                    "{:>9} {:<8} {:10.2f} ms {:10.2f} MB".format(
+                        size, name, seconds * 1000, peak / 1e6
+                    )
+                )
+
+    return results
+
+
+################################################################################
+def compare(results, baseline, time_tolerance, memory_tolerance):
+    """Returns the list of regressions against the baseline."""
+
+    regressions = []
+    for size, stages in results.items():
+        for name, result in stages.items():
+            base = baseline.get(size, dict()).get(name)
+            if base is None:
+                continue
+
+            allowed = max(
+                base["seconds"] * (1 + time_tolerance), base["seconds"] + MIN_SECONDS
+            )
+            if result["seconds"] > allowed:
+                regressions.append(
+                    "{} {}: {:.2f} ms (baseline {:.2f} ms)".format(
+                        size, name, result["seconds"] * 1000, base["seconds"] * 1000
+                    )
+                )
+
+            allowed = max(
+                base["peak_bytes"] * (1 + memory_tolerance),
+                base["peak_bytes"] + MIN_BYTES,
+            )
+            if result["peak_bytes"] > allowed:
+                regressions.append(
+                    "{} {}: {:.2f} MB (baseline {:.2f} MB)".format(
+                        size,
+                        name,
+                        result["peak_bytes"] / 1e6,
+                        base["peak_bytes"] / 1e6,
+                    )
+                )
+
+    return regressions
+
+
+################################################################################
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description=__doc__.split("\n\n")[0],
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument(
+        "--sizes",
+        default="10,1000,100000",
+        help="comma separated numbers of anniversaries (default: 10,1000,100000)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage")
+    parser.add_argument(
+        "--skew", type=float, default=1.0, help="skew of the dates (Zipf exponent)"
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("auto", "python", "numpy"),
+        default="auto",
+        help="index of the anniversaries (default: auto)",
+    )
+    parser.add_argument(
+        "--pdf-max",
+        type=int,
+        default=10000,
+        help="largest config to render as PDF (default: 10000)",
+    )
+    parser.add_argument(
+        "--baseline",
+        default=os.path.join(BASE_DIR, "benchmarks", "baseline.json"),
+        help="baseline file (default: benchmarks/baseline.json)",
+    )
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument(
+        "--save", action="store_true", help="store the results as baseline"
+    )
+    group.add_argument(
+        "--compare", action="store_true", help="fail on regressions to the baseline"
+    )
+    parser.add_argument(
+        "--time-tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown against the baseline (default: 0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--memory-tolerance",
+        type=float,
+        default=0.10,
+        help="allowed additional memory against the baseline (default: 0.10)",
+    )
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    module = load_processor_module()
+    module.BaseProcessor.engine = args.engine
+    results = run_suite(module, sizes, args.repeat, args.skew, args.pdf_max)
+
+    if args.save:
+        with open(args.baseline, "w") as fh:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "skew": args.skew,
+                    "engine": args.engine,
+                    "results": results,
+                },
+                fh,
+                indent=1,
+                sort_keys=True,
+            )
+        print("Saved baseline to {}".format(args.baseline))
+
+    if args.compare:
+        with open(args.baseline, "r") as fh:
+            baseline = json.load(fh)
+        if baseline.get("skew") != args.skew:
+            sys.exit("The baseline was taken with another skew")
+        if baseline.get("engine", "auto") != args.engine:
+            sys.exit("The baseline was taken with another engine")
+
+        regressions = compare(
+            results,
+            baseline["results"],
+            args.time_tolerance,
+            args.memory_tolerance,
+        )
+        if regressions:
+            print()
+            print("{} regression(s):".format(len(regressions)))
+            for regression in regressions:
+                print("   {}".format(regression))
+            sys.exit(1)
+
+        print()
+        print("No regressions against {}".format(args.baseline))
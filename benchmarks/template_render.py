@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""Compares the compiled month template with the former str.replace rendering.
+
+Both paths render all months of a year of a dense synthetic calendar; the
+results are checked to be identical (the year starts on a Thursday, so the
+former week counter gives the ISO week numbers, too).
+
+Usage: template_render.py [anniversaries per day] [rounds]
+"""
+
+import calendar
+import os
+import sys
+import time
+
+from common import BASE_DIR, load_processor_module, make_processor
+from common import synthetic_anniversaries
+
+
+################################################################################
+def legacy_create_html(template, month_names, year, month, data, state):
+    """The rendering of HtmlProcessor._create_html before the compiled template."""
+
+    if month == 1:
+        state["week_number"] = 0
+
+    tmp = template
+    tmp = tmp.replace("###month###", "{}".format(month_names[month]))
+    tmp = tmp.replace("###year###", "{}".format(year))
+
+    month_matrix = calendar.monthcalendar(year, month)
+
+    inner_html = []
+    for week in month_matrix:
+
+        if state["week_number"] == 0:
+            if week[3] > 0:
+                state["week_number"] = 1
+        elif week[0] > 0:
+            state["week_number"] += 1
+
+        inner_html.append("<tr>")
+        inner_html.append("<td><br><br>")
+        if state["week_number"] > 0:
+            inner_html.append("{}".format(state["week_number"]))
+        inner_html.append("</td>")
+
+        for day in week:
+            line = "<td>"
+            if day > 0:
+                line += '<div class="inner_head">'
+                line += "{}".format(day)
+                line += "</div>"
+
+                cur_date = "{}-{:02d}-{:02d}".format(year, month, day)
+                if cur_date in data.keys():
+                    line += '<div class="inner_content">'
+                    tmp_contents = [
+                        '<span style="color: {}; background-color: {};"><span class="inner_content_marker">{}</span> {}</span>'.format(
+                            entry["color"],
+                            entry["bgcolor"],
+                            entry["symbol"],
+                            entry["data"],
+                        )
+                        for entry in data[cur_date]
+                    ]
+                    line += "<br>".join(tmp_contents)
+                    line += "</div>"
+
+            line += "</td>"
+            inner_html.append(line)
+
+        inner_html.append("</tr>")
+
+    return tmp.replace("###calendar_data###", "\n".join(inner_html))
+
+
+################################################################################
+def legacy_data(entries, year):
+    data = dict()
+    for entry in entries:
+        key = "{}-{:02d}-{:02d}".format(year, entry.month, entry.day)
+        data.setdefault(key, []).append(
+            {
+                "symbol": entry.style.symbol,
+                "data": entry.label(year),
+                "color": entry.style.color,
+                "bgcolor": entry.style.bgcolor,
+            }
+        )
+    return data
+
+
+################################################################################
+if __name__ == "__main__":
+
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    year = 2026
+
+    module = load_processor_module()
+
+    entries = synthetic_anniversaries(module, per_day, year)
+    processor = make_processor(
+        module.HtmlProcessor,
+        entries,
+        template_dir=os.path.join(BASE_DIR, "templates"),
+        year=year,
+    )
+    processor._read_template()
+    legacy_best = compiled_best = data_best = None
+    for _ in range(rounds):
+        # the former layout prepared all labels up front
+        start = time.perf_counter()
+        data = legacy_data(entries, year)
+        seconds = time.perf_counter() - start
+        data_best = min(data_best or seconds, seconds)
+
+        start = time.perf_counter()
+        state = dict()
+        legacy = [
+            legacy_create_html(
+                processor.template, processor.month_names, year, month, data, state
+            )
+            for month in range(1, 13)
+        ]
+        seconds = time.perf_counter() - start
+        legacy_best = min(legacy_best or seconds, seconds)
+
+        start = time.perf_counter()
+        compiled = []
+        for processor.month in range(1, 13):
+            processor._create_html()
+            compiled.append(processor.html)
+        seconds = time.perf_counter() - start
+        compiled_best = min(compiled_best or seconds, seconds)
+
+    assert legacy == compiled, "the compiled template renders different HTML"
+
+    print(
+        "{} anniversaries ({} per day), best of {}".format(
+            len(entries), per_day, rounds
+        )
+    )
+    print("   str.replace:            {:8.1f} ms / year".format(legacy_best * 1000))
+    print(
+        "   incl. preparing labels: {:8.1f} ms / year".format(
+            (legacy_best + data_best) * 1000
+        )
+    )
+    print("   compiled (incl. labels):{:8.1f} ms / year".format(compiled_best * 1000))
+    print(
+        "   speedup:                {:8.2f}x".format(
+            (legacy_best + data_best) / compiled_best
+        )
+    )
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""Compares assembling the year file in-process with the former pdftk calls.
+
+The months of a dense synthetic year are rendered once (needs WeasyPrint).
+The year file is then made of their pages rotated east – as the PDF mode
+does – and the way it was made before: the monthly PDF files concatenated
+by one pdftk call and rotated by a second one.
+
+Usage: year_assembly.py [anniversaries per day] [rounds]
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import BASE_DIR, load_processor_module, make_processor
+from common import synthetic_anniversaries
+
+
+################################################################################
+def legacy_year_file(pdftk, pdf_files, year_file):
+    """The year file as created by the two pdftk calls before."""
+
+    tmp_file = year_file + ".tmp.pdf"
+    subprocess.run([pdftk] + pdf_files + ["cat", "output", tmp_file], check=True)
+    subprocess.run(
+        [pdftk, tmp_file, "cat", "1-endeast", "output", year_file], check=True
+    )
+    os.remove(tmp_file)
+
+
+################################################################################
+if __name__ == "__main__":
+
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    year = 2026
+
+    module = load_processor_module()
+    try:
+        import weasyprint  # noqa: F401
+    except ImportError:
+        sys.exit("WeasyPrint is not installed")
+
+    entries = synthetic_anniversaries(module, per_day, year)
+    processor = make_processor(
+        module.HtmlProcessor,
+        entries,
+        template_dir=os.path.join(BASE_DIR, "templates"),
+        year=year,
+    )
+    processor._read_template()
+    base_url = os.path.join(processor.template_dir, "html")
+
+    documents = []
+    for processor.month in range(1, 13):
+        processor._create_html()
+        html_source = {"string": processor.html, "base_url": base_url}
+        documents.append(module.render_pdf(html_source))
+    pages = [page for document in documents for page in document.pages]
+
+    in_process_best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        module.make_year_pdf_data(documents[0], pages)
+        seconds = time.perf_counter() - start
+        in_process_best = min(in_process_best or seconds, seconds)
+
+    print(
+        "{} anniversaries ({} per day), {} pages, best of {}".format(
+            len(entries), per_day, len(pages), rounds
+        )
+    )
+    print("   in-process:  {:8.1f} ms / year".format(in_process_best * 1000))
+
+    pdftk = shutil.which("pdftk")
+    if pdftk is None:
+        print("   pdftk:       not installed")
+        sys.exit()
+
+    pdftk_best = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # the monthly files are written in both cases: not part of the timing
+        pdf_files = []
+        for month, document in enumerate(documents, 1):
+            pdf_file = os.path.join(tmp_dir, "{}-{:02d}.pdf".format(year, month))
+            document.write_pdf(pdf_file)
+            pdf_files.append(pdf_file)
+
+        for _ in range(rounds):
+            start = time.perf_counter()
+            legacy_year_file(pdftk, pdf_files, os.path.join(tmp_dir, "year.pdf"))
+            seconds = time.perf_counter() - start
+            pdftk_best = min(pdftk_best or seconds, seconds)
+
+    print("   pdftk:       {:8.1f} ms / year".format(pdftk_best * 1000))
+    print(
+        "   time saved:  {:8.1f} ms / year".format(
+            (pdftk_best - in_process_best) * 1000
+        )
+    )
@@ -2,4 +2,4 @@ $scriptPath = split-path -parent $MyInvocation.MyCommand.Definition
 
 cd $scriptPath
 
-py.exe src/anniversary-processor.py powershell
+py.exe src/launcher.py powershell
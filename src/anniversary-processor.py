@@ -1,571 +1,4218 @@
 #!/usr/bin/env python3
 
-import calendar
+import argparse
+import bisect
+import contextlib
 import configparser
 import datetime
+import hashlib
+import io
+import json
 import os.path
 import re
-import subprocess
 import sys
-import uuid
+import time
+import _thread
 from submodules.xeeTools.xeeTools import dd, ex_to_str
 
-try:
-    import weasyprint
-except ModuleNotFoundError:
-    pass
-except Exception as ex:
-    raise ex
+# the imports only some modes need (weasyprint, http.server, pickle etc.)
+# are done where they are used – the shell modes run on every new terminal
 
 
 ################################################################################
 ################################################################################
-class BaseProcessor:
-    """This is the base class holding all methods re-used by derived classes."""
+class Style:
+    """The display style and reminders of a config section – shared by all its
+    anniversaries.
 
-    data = dict()
+    remind are the reminder offsets (ical durations relative to the start of
+    the day, e.g. "-P1W" or "PT9H") set for the section, None if not set.
+    """
 
-    month_names = {
-        1: "January",
-        2: "February",
-        3: "March",
-        4: "April",
-        5: "May",
-        6: "June",
-        7: "July",
-        8: "August",
-        9: "September",
-        10: "October",
-        11: "November",
-        12: "December",
-    }
+    __slots__ = ("symbol", "color", "bgcolor", "remind")
 
     ############################################################################
-    def __init__(self):
-        self._set_env()
-        self._readConfig()
-        self._prepare_data()
+    def __init__(self, symbol, color, bgcolor, remind=None):
+        self.symbol = symbol
+        self.color = color
+        self.bgcolor = bgcolor
+        self.remind = remind
 
     ############################################################################
-    def _set_env(self):
-        script_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
-        self.config_dir = os.path.join(script_dir[:-3], "etc")
-        self.template_dir = os.path.join(script_dir[:-3], "templates")
-        self.output_dir = os.path.join(script_dir[:-3], "output")
+    def __getstate__(self):
+        return (self.symbol, self.color, self.bgcolor, self.remind)
 
     ############################################################################
-    def run(self):
+    def __setstate__(self, state):
+        self.symbol, self.color, self.bgcolor, self.remind = state
 
-        print("No output from BaseProcessor")
+    ############################################################################
+    def triggers(self, default):
+        """The reminder offsets of the section – default if it has none set."""
+
+        return default if self.remind is None else self.remind
+
+
+################################################################################
+################################################################################
+class Anniversary:
+    """One anniversary of the config – stored once, shown in any year.
+
+    month is None for monthly anniversaries, year is the year of the first
+    occurrence (or None if unknown). The style is shared by all anniversaries
+    of a section.
+    """
+
+    __slots__ = ("section", "name", "style", "year", "month", "day")
 
     ############################################################################
-    def _readConfig(self):
-        self.config = dict()
-        # using RawConfigParser with optionxform preserves the case
-        self.config["monthly"] = configparser.RawConfigParser()
-        self.config["monthly"].read(os.path.join(self.config_dir, "monthly.cfg"))
-        self.config["monthly"].optionxform = str
-        self.config["yearly"] = configparser.RawConfigParser()
-        self.config["yearly"].optionxform = str
-        self.config["yearly"].read(os.path.join(self.config_dir, "yearly.cfg"))
+    def __init__(self, section, name, style, year, month, day):
+        self.section = section
+        self.name = name
+        self.style = style
+        self.year = year
+        self.month = month
+        self.day = day
 
     ############################################################################
-    def _prepare_data(self):
+    def __getstate__(self):
+        return (self.section, self.name, self.style, self.year, self.month, self.day)
 
-        this_year = datetime.datetime.now().year
-        next_year = this_year + 1
+    ############################################################################
+    def __setstate__(self, state):
+        self.section, self.name, self.style, self.year, self.month, self.day = state
 
-        year_regex = re.compile("[12][0-9]{3}")
+    ############################################################################
+    def occurs_in(self, year):
+        return self.year is None or self.year <= year
 
-        for interval in self.config.keys():
+    ############################################################################
+    def label(self, year):
+        """The name as shown in the given year – including the age if known."""
 
-            for section in self.config[interval].sections():
+        if self.year is None:
+            return self.name
 
-                if self.config[interval].has_option(section, "symbol"):
-                    symbol = self.config[interval].get(section, "symbol")
-                else:
-                    symbol = "?"
+        return "{} ({})".format(self.name, year - self.year)
 
-                if self.config[interval].has_option(section, "color"):
-                    color = self.config[interval].get(section, "color")
-                else:
-                    color = "#000000"
 
-                if self.config[interval].has_option(section, "bgcolor"):
-                    bgcolor = self.config[interval].get(section, "bgcolor")
-                else:
-                    bgcolor = "#ffffff"
+################################################################################
+################################################################################
+class DateIndex:
+    """Index of the anniversaries by their day in the month/year.
 
-                for option in self.config[interval].options(section):
-                    if option in ["symbol", "color", "bgcolor"]:
-                        continue
+    Every anniversary is stored once, sorted by (month, day) – monthly ones by
+    day only. The anniversaries of any month of any year are found by
+    bisection, so a range query costs O(log n + k) per month and no
+    occurrences are stored at all.
+    """
 
-                    tmp = self.config[interval].get(section, option)
-                    cur_key = "{}".format(this_year) + "-" + tmp[-5:]
-                    next_key = "{}".format(next_year) + "-" + tmp[-5:]
-
-                    if cur_key not in self.data.keys():
-                        self.data[cur_key] = []
-                    if next_key not in self.data.keys():
-                        self.data[next_key] = []
-
-                    cur_data = {
-                        "symbol": symbol,
-                        "data": "{}".format(option),
-                        "color": color,
-                        "bgcolor": bgcolor,
-                    }
-                    next_data = {
-                        "symbol": symbol,
-                        "data": "{}".format(option),
-                        "color": color,
-                        "bgcolor": bgcolor,
-                    }
+    ############################################################################
+    def __init__(self, entries):
+        yearly = []
+        monthly = []
+        for entry in entries:
+            if entry.month is None:
+                monthly.append((entry.day, entry))
+            else:
+                yearly.append((entry.month * 32 + entry.day, entry))
+
+        # sort by key only: entries on the same day keep the config order
+        yearly.sort(key=lambda item: item[0])
+        monthly.sort(key=lambda item: item[0])
+
+        self.yearly_keys = [key for key, _ in yearly]
+        self.yearly = [entry for _, entry in yearly]
+        self.monthly_keys = [key for key, _ in monthly]
+        self.monthly = [entry for _, entry in monthly]
+
+    ############################################################################
+    def month(self, year, month, first_day=1, last_day=31):
+        """Returns (day, entry) of all anniversaries in the given month.
+
+        The list is sorted by day; days not existing in this month (e.g.
+        02-29 in a non-leap year) are skipped.
+        """
+
+        last_day = min(last_day, days_in_month(year, month))
+
+        lo = bisect.bisect_left(self.monthly_keys, first_day)
+        hi = bisect.bisect_right(self.monthly_keys, last_day)
+        days = list(zip(self.monthly_keys[lo:hi], self.monthly[lo:hi]))
+
+        lo = bisect.bisect_left(self.yearly_keys, month * 32 + first_day)
+        hi = bisect.bisect_right(self.yearly_keys, month * 32 + last_day)
+        if lo < hi:
+            yearly = [
+                (key - month * 32, entry)
+                for key, entry in zip(self.yearly_keys[lo:hi], self.yearly[lo:hi])
+            ]
+            if days:
+                # stable: monthly entries first on the same day
+                days += yearly
+                days.sort(key=lambda item: item[0])
+            else:
+                days = yearly
+
+        return days
+
+    ############################################################################
+    def occurrences(self, start, end):
+        """Yields (date, anniversary) from start to end (see BaseProcessor)."""
+
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            first_day = start.day if (year, month) == (start.year, start.month) else 1
+            last_day = end.day if (year, month) == (end.year, end.month) else 31
+
+            for day, entry in self.month(year, month, first_day, last_day):
+                if entry.occurs_in(year):
+                    yield datetime.date(year, month, day), entry
 
-                    if year_regex.match(tmp[:4]):
-                        age = this_year - int(tmp[:4])
-                        cur_data["data"] += " ({})".format(age)
-                        next_data["data"] += " ({})".format(age + 1)
+            month += 1
+            if month > 12:
+                year += 1
+                month = 1
 
-                    self.data[cur_key].append(cur_data)
-                    self.data[next_key].append(next_data)
+    ############################################################################
+    def month_data(self, year, month):
+        """Returns a dict day => list of anniversaries for the given month."""
+
+        data = dict()
+        for day, entry in self.month(year, month):
+            if entry.occurs_in(year):
+                data.setdefault(day, []).append(entry)
+
+        return data
 
 
 ################################################################################
 ################################################################################
-class ShellProcessor(BaseProcessor):
-    """This holds the functionality to get anniversaries to your shell."""
+class ColumnarIndex:
+    """Index of the anniversaries as NumPy columns: year, month, day and
+    section id – a replacement for DateIndex with many anniversaries.
 
-    lines = []
+    The occurrences of any window (see occurrence_columns()) are computed in
+    batch: the dates of all anniversaries at once instead of one anniversary
+    at a time. Needs NumPy, see make_index().
+    """
 
     ############################################################################
-    def run(self):
-        self._build_lines()
-        self._print()
+    def __init__(self, entries):
+        import numpy
+
+        self.entries = list(entries)
+        count = len(self.entries)
+
+        # 0 is the year of anniversaries with unknown year (so it is always
+        # <= the year asked for) and the month of monthly ones
+        self.year = numpy.fromiter(
+            (entry.year or 0 for entry in self.entries), numpy.int32, count
+        )
+        self.month = numpy.fromiter(
+            (entry.month or 0 for entry in self.entries), numpy.int8, count
+        )
+        self.day = numpy.fromiter(
+            (entry.day for entry in self.entries), numpy.int8, count
+        )
+        section_ids = dict()
+        self.section = numpy.fromiter(
+            (
+                section_ids.setdefault(entry.section, len(section_ids))
+                for entry in self.entries
+            ),
+            numpy.int32,
+            count,
+        )
+        # section id => section
+        self.sections = list(section_ids)
+
+        # like DateIndex: sorted by key only, so entries on the same day keep
+        # the config order
+        monthly = self.month == 0
+        keys = self.month.astype(numpy.int32) * 32 + self.day
+        self.yearly_order = numpy.flatnonzero(~monthly)
+        self.yearly_order = self.yearly_order[
+            numpy.argsort(keys[self.yearly_order], kind="stable")
+        ]
+        self.yearly_keys = keys[self.yearly_order]
+        self.monthly_order = numpy.flatnonzero(monthly)
+        self.monthly_order = self.monthly_order[
+            numpy.argsort(keys[self.monthly_order], kind="stable")
+        ]
+        self.monthly_keys = keys[self.monthly_order]
 
     ############################################################################
-    def _build_lines(self):
+    def occurrence_columns(self, start, end):
+        """The occurrences from start to end (both inclusive) as NumPy columns.
+
+        Returns a dict of arrays of the same length, sorted like occurrences():
+        entry (index into self.entries), year, month and day.
+        """
 
-        last_week = (datetime.datetime.today() - datetime.timedelta(7)).strftime(
-            "%Y-%m-%d"
+        import numpy
+
+        found = []
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            first_day = start.day if (year, month) == (start.year, start.month) else 1
+            last_day = end.day if (year, month) == (end.year, end.month) else 31
+            last_day = min(last_day, days_in_month(year, month))
+
+            # monthly ones first: on the same day they come first (as in
+            # DateIndex), the stable sort below keeps that
+            for keys, order, offset in (
+                (self.monthly_keys, self.monthly_order, 0),
+                (self.yearly_keys, self.yearly_order, month * 32),
+            ):
+                lo = numpy.searchsorted(keys, offset + first_day, "left")
+                hi = numpy.searchsorted(keys, offset + last_day, "right")
+                entries = order[lo:hi]
+                occurs = self.year[entries] <= year
+                found.append(
+                    (entries[occurs], year, month, keys[lo:hi][occurs] - offset)
+                )
+
+            month += 1
+            if month > 12:
+                year += 1
+                month = 1
+
+        if not found:
+            found.append((self.yearly_order[:0], 0, 0, self.yearly_keys[:0]))
+
+        entries = numpy.concatenate([part[0] for part in found])
+        years = numpy.concatenate(
+            [numpy.full(len(part[0]), part[1], numpy.int32) for part in found]
         )
-        today = (datetime.datetime.today()).strftime("%Y-%m-%d")
-        next_week = (datetime.datetime.today() + datetime.timedelta(7)).strftime(
-            "%Y-%m-%d"
+        months = numpy.concatenate(
+            [numpy.full(len(part[0]), part[2], numpy.int32) for part in found]
         )
-        next_month = (datetime.datetime.today() + datetime.timedelta(30)).strftime(
-            "%Y-%m-%d"
+        days = numpy.concatenate([part[3] for part in found]).astype(numpy.int32)
+
+        order = numpy.argsort((years * 13 + months) * 32 + days, kind="stable")
+        entries, years, months, days = (
+            entries[order],
+            years[order],
+            months[order],
+            days[order],
         )
 
-        self.lines.append("")
+        return {"entry": entries, "year": years, "month": months, "day": days}
 
-        last_time = ""
+    ############################################################################
+    def occurrences(self, start, end):
+        """Yields (date, anniversary) from start to end (see BaseProcessor)."""
 
-        for date, entries in sorted(self.data.items()):
+        columns = self.occurrence_columns(start, end)
+        entries = self.entries
 
-            if date < last_week:
-                continue
+        for entry, year, month, day in zip(
+            columns["entry"].tolist(),
+            columns["year"].tolist(),
+            columns["month"].tolist(),
+            columns["day"].tolist(),
+        ):
+            yield datetime.date(year, month, day), entries[entry]
 
-            if date > next_month:
-                continue
+    ############################################################################
+    def month_data(self, year, month):
+        """Returns a dict day => list of anniversaries for the given month."""
 
-            for entry in entries:
+        import numpy
 
-                if date < today:
-                    cur_time = "last_week"
-                elif date == today:
-                    cur_time = "today"
-                elif date <= next_week:
-                    cur_time = "next_week"
-                else:
-                    cur_time = "next_month"
+        columns = self.occurrence_columns(
+            datetime.date(year, month, 1),
+            datetime.date(year, month, days_in_month(year, month)),
+        )
+        days = columns["day"]
+        entries = columns["entry"].tolist()
 
-                if last_time and last_time != cur_time:
-                    self.lines.append("")
+        # the occurrences are sorted by day: split them where the day changes
+        starts = numpy.flatnonzero(numpy.diff(days, prepend=0)).tolist()
+        ends = starts[1:] + [len(entries)]
 
-                date_ext = "{} ({})".format(
-                    date, datetime.datetime.strptime(date, "%Y-%m-%d").strftime("%a")
-                )
-                line = "{}:    {} {}".format(date_ext, entry["symbol"], entry["data"])
-                line = self._prepare_line(line, cur_time)
+        data = dict()
+        for day, lo, hi in zip(days[starts].tolist(), starts, ends):
+            data[day] = [self.entries[entry] for entry in entries[lo:hi]]
 
-                self.lines.append(line)
+        return data
 
-                last_time = cur_time
 
-        self.lines.append("")
+################################################################################
+################################################################################
+class MonthTemplate:
+    """A template compiled into static segments and ###slot### placeholders."""
+
+    # compiled templates by their text – shared by all processors of a process
+    compiled = dict()
+
+    slot_regex = re.compile("###([a-z_]+)###")
 
     ############################################################################
-    def _prepare_line(self, line, line_time):
-        """Use this method in your derived classes to e.g. colorize the lines."""
+    def __init__(self, text):
+        self.parts = []
 
-        return line
+        pos = 0
+        for match in self.slot_regex.finditer(text):
+            self.parts.append((text[pos : match.start()], match.group(1)))
+            pos = match.end()
+        self.parts.append((text[pos:], None))
 
     ############################################################################
-    def _print(self):
-        for line in self.lines:
-            print(line)
+    @classmethod
+    def compile(cls, text):
+        if text not in cls.compiled:
+            cls.compiled[text] = cls(text)
+
+        return cls.compiled[text]
 
     ############################################################################
-    def test_output(self):
+    def render(self, out, values):
+        """Appends the rendered template to the list out.
 
-        testlines = []
-        print(self._prepare_line("last_week", "last_week"))
-        print(self._prepare_line("today", "today"))
-        print(self._prepare_line("next_week", "next_week"))
-        print(self._prepare_line("next_month", "next_month"))
+        values maps slot names to strings or to callables appending their
+        content to out themselves; unknown slots are kept as they are.
+        """
+
+        for static, slot in self.parts:
+            out.append(static)
+            if slot is None:
+                continue
+            value = values.get(slot)
+            if value is None:
+                out.append("###{}###".format(slot))
+            elif callable(value):
+                value(out)
+            else:
+                out.append(value)
 
 
 ################################################################################
 ################################################################################
-class BashProcessor(ShellProcessor):
-    """This holds the functionality to get anniversaries to your bash."""
+class AtomicFile:
+    """A file written to a temp file next to it and moved into place when the
+    with statement ends without error – readers never see it half-written.
+
+    The file gets the permissions of a file created by open() (see
+    file_mode), not the owner-only ones of mkstemp(). The directory is
+    created if needed. mode and kwargs are those of open().
+    """
 
     ############################################################################
-    def _prepare_line(self, line, line_time):
-        """Use this method in your derived classes to e.g. colorize the lines."""
+    def __init__(self, filename, mode="wb", **kwargs):
+        self.filename = filename
+        self.mode = mode
+        self.kwargs = kwargs
 
-        colors = {
-            "last_week": "\033[0;31m",
-            "today": "\033[1;31m",
-            "next_week": "\033[0;32m",
-            "next_month": "\033[0;36m",
-            "clear": "\033[0m",
-        }
+    ############################################################################
+    def __enter__(self):
+        import tempfile
 
-        line = colors[line_time] + line + colors["clear"]
+        file_dir = os.path.dirname(os.path.abspath(self.filename))
+        os.makedirs(file_dir, exist_ok=True)
+        fd, self.tmp_file = tempfile.mkstemp(dir=file_dir, suffix=".tmp")
+        try:
+            self.fh = os.fdopen(fd, self.mode, **self.kwargs)
+        except BaseException:
+            os.close(fd)
+            os.unlink(self.tmp_file)
+            raise
 
-        return line
+        return self.fh
+
+    ############################################################################
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            self.fh.close()
+            if exc_type is None:
+                os.chmod(self.tmp_file, file_mode)
+                os.replace(self.tmp_file, self.filename)
+                return False
+        except BaseException:
+            os.unlink(self.tmp_file)
+            raise
+
+        os.unlink(self.tmp_file)
+
+        return False
 
 
 ################################################################################
-################################################################################
-class PowershellProcessor(ShellProcessor):
-    """This holds the functionality to get anniversaries to your powershell."""
+def get_umask():
+    """The umask of the process – it can be read by setting it only."""
 
-    ############################################################################
-    def _prepare_line(self, line, line_time):
-        """Use this method in your derived classes to e.g. colorize the lines."""
+    umask = os.umask(0)
+    os.umask(umask)
 
-        colors = {
-            "last_week": "last week    ",
-            "today": "TODAY!!      ",
-            "next_week": "next week    ",
-            "next_month": "next month   ",
-            "clear": "",
-        }
+    return umask
 
-        line = colors[line_time] + line + colors["clear"]
 
-        return line
+# the permissions of the files written by AtomicFile – read on import, while
+# there are no threads creating files with the umask 0 set meanwhile
+file_mode = 0o666 & ~get_umask()
 
 
 ################################################################################
 ################################################################################
-class HtmlProcessor(BaseProcessor):
+class Manifest:
+    """Digests of the inputs each output file was created from.
 
-    ############################################################################
-    def run(self):
-        self._read_template()
+    The manifest lives in output/manifest.json; a file whose recorded digest
+    equals the digest of its current inputs does not need to be recreated.
+    """
 
-        for self.year in (
-            datetime.datetime.now().year,
-            datetime.datetime.now().year + 1,
-        ):
-            for self.month in range(1, 13):
-                self._create_html()
-                self._write_html("{}-{:02d}".format(self.year, self.month))
+    # processors may save in threads (see AllProcessor) – _thread is built in,
+    # importing threading would cost start-up time of the shell modes
+    save_lock = _thread.allocate_lock()
 
     ############################################################################
-    def _read_template(self):
-        tpl_file = os.path.join(self.template_dir, "html", "month.tpl.htm")
-        with open(tpl_file, "r") as fh:
-            self.template = fh.read()
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.manifest_file = os.path.join(output_dir, "manifest.json")
+        self.artifacts = self._read()
+        self.updates = dict()
 
     ############################################################################
-    def _create_html(self):
+    def _read(self):
+        try:
+            with open(self.manifest_file, "r") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return dict()
 
-        # reset week counter on January
-        if self.month == 1:
-            self.week_number = 0
-
-        tmp = self.template
-        tmp = tmp.replace("###month###", "{}".format(self.month_names[self.month]))
-        tmp = tmp.replace("###year###", "{}".format(self.year))
+    ############################################################################
+    def _key(self, path):
+        return os.path.relpath(path, self.output_dir)
 
-        month_matrix = calendar.monthcalendar(self.year, self.month)
+    ############################################################################
+    def is_fresh(self, digest, *paths):
+        """True if all the given files exist and were created from digest."""
 
-        inner_html = []
-        for week in month_matrix:
+        for path in paths:
+            if self.artifacts.get(self._key(path)) != digest:
+                return False
+            if not os.path.exists(path):
+                return False
 
-            # special case: first calendar week: number 1 is the week containing the first thursday (https://de.wikipedia.org/wiki/Woche#Z.C3.A4hlweise_nach_ISO_8601)
-            if self.week_number == 0:
-                if week[3] > 0:
-                    self.week_number = 1
-            # if there is a monday in current week: increment
-            elif week[0] > 0:
-                self.week_number += 1
+        return True
 
-            inner_html.append("<tr>")
-            inner_html.append("<td><br><br>")
-            if self.week_number > 0:
-                inner_html.append("{}".format(self.week_number))  # week number
-            inner_html.append("</td>")
+    ############################################################################
+    def update(self, digest, *paths):
+        for path in paths:
+            self.artifacts[self._key(path)] = digest
+            self.updates[self._key(path)] = digest
 
-            for day in week:
-                line = "<td>"
-                if day > 0:
-                    line += '<div class="inner_head">'
-                    line += "{}".format(day)
-                    line += "</div>"
-
-                    cur_date = "{}-{:02d}-{:02d}".format(self.year, self.month, day)
-                    if cur_date in self.data.keys():
-                        line += '<div class="inner_content">'
-                        tmp_contents = [
-                            '<span style="color: {}; background-color: {};"><span class="inner_content_marker">{}</span> {}</span>'.format(
-                                entry["color"],
-                                entry["bgcolor"],
-                                entry["symbol"],
-                                entry["data"],
-                            )
-                            for entry in self.data[cur_date]
-                        ]
-                        line += "<br>".join(tmp_contents)
-                        line += "</div>"
+    ############################################################################
+    def discard(self, *paths):
+        """Forgets the given files – e.g. if writing them failed."""
 
-                line += "</td>"
-                inner_html.append(line)
+        for path in paths:
+            self.artifacts.pop(self._key(path), None)
+            self.updates[self._key(path)] = None
 
-            inner_html.append("</tr>")
+    ############################################################################
+    def save(self):
+        if not self.updates:
+            return
 
-        tmp = tmp.replace("###calendar_data###", "\n".join(inner_html))
+        with self.save_lock:
+            # merge with what other processors wrote in the meantime
+            artifacts = self._read()
+            artifacts.update(self.updates)
+            for key, digest in self.updates.items():
+                if digest is None:
+                    del artifacts[key]
 
-        self.html = tmp
+            with AtomicFile(self.manifest_file, "w") as fh:
+                json.dump(artifacts, fh, indent=1, sort_keys=True)
 
-    ############################################################################
-    def _write_html(self, filename):
-        if not filename.endswith(".htm") or not filename.endswith(".html"):
-            filename += ".htm"
-        html_dir = os.path.join(self.output_dir, "html", "{}".format(self.year))
-        os.makedirs(html_dir, exist_ok=True)
-        html_file = os.path.join(html_dir, filename)
-        with open(html_file, "w") as fh:
-            fh.write(self.html)
+        self.artifacts = artifacts
+        self.updates = dict()
 
 
 ################################################################################
 ################################################################################
-class PdfProcessor(BaseProcessor):
+class Archive:
+    """One tar or zip archive taking the created files instead of output/.
+
+    The files are added as they are created – nothing is written to output/.
+    The archive is written to a temp file next to it which replaces it only
+    when the with statement ends without error, so readers never see a half
+    written set. "-" streams a .tar.gz to stdout; on error it stops there
+    (without the end of archive marker) – the exit code tells.
+    """
+
+    # file name suffix => archive format and tar compression
+    formats = {
+        ".tar": ("tar", ""),
+        ".tar.gz": ("tar", "gz"),
+        ".tgz": ("tar", "gz"),
+        ".tar.bz2": ("tar", "bz2"),
+        ".tar.xz": ("tar", "xz"),
+        ".zip": ("zip", None),
+    }
 
-    html_dir = None
-    pdf_dir = None
+    # files streamed in chunks (see add_chunks()) are kept in memory up to this
+    # size, beyond in an anonymous temp file – tar needs their size up front
+    spool_size = 64 * 1024 * 1024
 
     ############################################################################
-    def run(self):
+    def __init__(self, archive_file):
+        """Raises ValueError for a file name without a known suffix."""
 
-        for self.year in (
-            datetime.datetime.now().year,
-            datetime.datetime.now().year + 1,
-        ):
-            for self.month in range(1, 13):
-                self.html_dir = os.path.join(
-                    self.output_dir, "html", "{}".format(self.year)
-                )
-                self.pdf_dir = os.path.join(
-                    self.output_dir, "pdf", "{}".format(self.year)
-                )
-                self._make_pdf_from_html()
+        self.archive_file = archive_file
+        self.count = 0
+        self.bytes = 0
 
-            self._concat_year_pdf()
+        if archive_file == "-":
+            self.format, self.compression = self.formats[".tar.gz"]
+            return
 
-            # for some reason the created PDF is looking perfectly fine but once
-            # printed the table only fills a part of the page
-            # converting to PS as a workaround here (that gets printed fine)
-            self._convert_to_ps()
+        for suffix, archive_format in self.formats.items():
+            if archive_file.lower().endswith(suffix):
+                self.format, self.compression = archive_format
+                return
 
-    ############################################################################
-    def _make_pdf_from_html(self):
+        raise ValueError(
+            "unknown archive format: {} (supported: {})".format(
+                archive_file, ", ".join(self.formats)
+            )
+        )
 
-        os.makedirs(self.pdf_dir, exist_ok=True)
+    ############################################################################
+    def __enter__(self):
+        import threading
+
+        # processors may add files in threads (see AllProcessor)
+        self.lock = threading.Lock()
+        self.atomic_file = None
+        if self.archive_file == "-":
+            self.fh = sys.stdout.buffer
+        else:
+            self.atomic_file = AtomicFile(self.archive_file)
+            self.fh = self.atomic_file.__enter__()
+
+        if self.format == "zip":
+            import zipfile
+
+            self.archive = zipfile.ZipFile(self.fh, "w", zipfile.ZIP_DEFLATED)
+        else:
+            import tarfile
+
+            self.archive = tarfile.open(
+                fileobj=self.fh, mode="w|" + self.compression, format=tarfile.PAX_FORMAT
+            )
 
-        basename = "{}-{:02d}".format(self.year, self.month)
+        return self
 
-        html_file = os.path.join(self.html_dir, basename + ".htm")
-        pdf_file = os.path.join(self.pdf_dir, basename + ".pdf")
+    ############################################################################
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.atomic_file is None:
+            if exc_type is None:
+                self.archive.close()
+                self.fh.flush()
+                self._report()
+            return False
+
+        try:
+            self.archive.close()
+        except BaseException:
+            self.atomic_file.__exit__(*sys.exc_info())
+            raise
+        self.atomic_file.__exit__(exc_type, exc_value, traceback)
+
+        if exc_type is None:
+            self._report()
+
+        return False
 
-        print()
-        print("Creating {}".format(pdf_file))
+    ############################################################################
+    def _report(self):
+        print(
+            "Archived {} files ({} bytes) to {}".format(
+                self.count, self.bytes, self.archive_file
+            ),
+            file=sys.stderr,
+        )
 
-        # Load HTML file
-        html = weasyprint.HTML(filename=html_file)
+    ############################################################################
+    def add(self, name, data):
+        """Adds data (str or bytes) as file name – returns its size in bytes."""
 
-        # Define CSS for page size, orientation, and margins
-        # WeasyPrint uses CSS @page rules for layout
-        css = """
-        @page {
-            size: A4 landscape;
-            margin: 1cm;
-        }
-        """
+        if isinstance(data, str):
+            data = data.encode("utf-8")
 
-        # Convert to PDF with custom CSS
-        html.write_pdf(
-            pdf_file,
-            stylesheets=[weasyprint.CSS(string=css)],  # Apply custom CSS
-            presentational_hints=True,  # Optional: better HTML-to-PDF rendering
-        )
+        return self._add(name, io.BytesIO(data), len(data))
 
     ############################################################################
-    def _concat_year_pdf(self):
+    def add_chunks(self, name, chunks):
+        """Adds the str chunks as file name while they are created."""
 
-        month_files = []
-        for m in range(1, 13):
-            filename = "{}-{:02d}.pdf".format(self.year, m)
-            f = os.path.join(self.pdf_dir, filename)
-            month_files.append(f)
+        import tempfile
 
-        tmp_year_file = os.path.join("/tmp", "{}.pdf".format(self.year))
-        year_file = os.path.join(self.pdf_dir, "{}.pdf".format(self.year))
+        with tempfile.SpooledTemporaryFile(self.spool_size) as fh:
+            for chunk in chunks:
+                fh.write(chunk.encode("utf-8"))
+            size = fh.tell()
+            fh.seek(0)
+            return self._add(name, fh, size)
 
-        cmd = "pdftk {} cat output {}".format(" ".join(month_files), tmp_year_file)
+    ############################################################################
+    def _add(self, name, fh, size):
+        mtime = time.time()
+
+        if self.format == "zip":
+            import shutil
+            import zipfile
+
+            info = zipfile.ZipInfo(name, time.localtime(mtime)[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            with self.lock, self.archive.open(info, "w", force_zip64=True) as member:
+                shutil.copyfileobj(fh, member)
+                self.count += 1
+                self.bytes += size
+        else:
+            import tarfile
+
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = mtime
+            info.mode = 0o644
+            with self.lock:
+                self.archive.addfile(info, fh)
+                self.count += 1
+                self.bytes += size
+
+        return size
 
-        print()
-        print("Calling pdftk: {}".format(cmd))
-        errorcode = subprocess.call(cmd, shell=True)
 
-        if errorcode > 0:
-            print(
-                "Error {} calling pdftk – could not concat monthly PDF files".format(
-                    errorcode
-                )
-            )
+################################################################################
+################################################################################
+class FileWriter:
+    """Writes the output files in background threads while the processors go
+    on rendering – shared by all processors of a run.
 
-        print()
+    Every file is written to a temp file in its directory and moved into
+    place, so readers never see a half-written file; a file whose content did
+    not change is not touched at all. At most max_pending files are queued,
+    queueing one more waits for a writer. flush() waits for all of them.
 
-        cmd = f"pdftk {tmp_year_file} cat 1-endeast output {year_file}".format(
-            " ".join(month_files), year_file
-        )
+    The processors share the writer of the process (see get_file_writer())
+    unless they get one.
+    """
 
-        print()
-        print("Calling pdftk: {}".format(cmd))
-        errorcode = subprocess.call(cmd, shell=True)
+    # files queued in chunks (see write_chunks()) are kept in memory up to this
+    # size, beyond in an anonymous temp file until they are written
+    spool_size = 16 * 1024 * 1024
 
-        if errorcode > 0:
-            print(
-                "Error {} calling pdftk – could not concat monthly PDF files".format(
-                    errorcode
-                )
-            )
+    ############################################################################
+    def __init__(self, jobs=4, max_pending=32):
+        """jobs is the number of writer threads."""
 
-        print()
+        self.jobs = jobs
+        self.max_pending = max_pending
+        self.executor = None
 
     ############################################################################
-    def _convert_to_ps(self):
+    def _start(self):
+        import concurrent.futures
+        import threading
 
-        pdf2ps = "/usr/bin/pdf2ps"
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            self.jobs, thread_name_prefix="writer"
+        )
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.lock = threading.Lock()
+        self.futures = []
+        self.errors = []
 
-        for f in os.listdir(self.pdf_dir):
-            if f.endswith(".pdf") and "-" in f:
-                pdf_file = os.path.join(self.pdf_dir, f)
-                ps_file = f"print__{f}".replace(".pdf", ".ps")
-                ps_file = os.path.join(self.pdf_dir, ps_file)
-                cmd = f"{pdf2ps} {pdf_file} {ps_file}"
+    ############################################################################
+    def write(self, filename, data, metrics=None):
+        """Queues data (str or bytes) to be written to filename – returns its
+        size in bytes.
 
-                print()
-                print(f"Converting to .ps: {cmd}")
-                subprocess.call(cmd, shell=True)
+        metrics gets the stage write of the file (see Metrics), measured in
+        the writer thread.
+        """
 
-        f = os.path.join(self.pdf_dir, "print__each_month_from_ps_files_one_by_one_to_avoid_problems_with_size")
-        subprocess.call(f"touch {f}", shell="True")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
 
+        return self._queue(filename, io.BytesIO(data), len(data), metrics)
 
-################################################################################
-################################################################################
-class IcalProcessor(BaseProcessor):
-    """This holds the functionality to get anniversaries to an ical file."""
+    ############################################################################
+    def write_chunks(self, filename, chunks, metrics=None):
+        """Queues the str chunks to be written to filename while they are
+        created – returns the size in bytes."""
+
+        import tempfile
+
+        fh = tempfile.SpooledTemporaryFile(self.spool_size)
+        try:
+            for chunk in chunks:
+                fh.write(chunk.encode("utf-8"))
+        except BaseException:
+            fh.close()
+            raise
+        size = fh.tell()
+        fh.seek(0)
 
-    ical_events = []
-    ical_file_content = ""
+        return self._queue(filename, fh, size, metrics)
 
     ############################################################################
-    def run(self):
-        for self.year in (
-            datetime.datetime.now().year,
-            datetime.datetime.now().year + 1,
-        ):
-            self._create_ical_events()
-            self._create_ical_file_content()
-            self._write_ical_file()
+    def _queue(self, filename, fh, size, metrics):
+        if self.executor is None:
+            self._start()
+
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(self._write, filename, fh, size, metrics)
+        except BaseException:
+            self.slots.release()
+            fh.close()
+            raise
+        with self.lock:
+            self.futures.append(future)
+
+        return size
 
     ############################################################################
-    def _create_ical_events(self):
-        self.ical_events = []
-        for date, events in self.data.items():
-            for event in events:
-                if not date.startswith(str(self.year)):
-                    continue
-                now = datetime.datetime.now().isoformat()
-                event_uuid = uuid.uuid4()
-                start = date
-                d = datetime.datetime.strptime(date, "%Y-%m-%d")
-                d += datetime.timedelta(days=1)
-                end = d.isoformat()[:10]
-                data = event["symbol"] + " " + event["data"]
-                ical_event = []
-
-                ical_event.append(f"BEGIN:VEVENT")
-
-                # date and information for the event
-                ical_event.append(f"UID:{event_uuid}")
-                ical_event.append(f"DTSTART;VALUE=DATE:{start}")
-                ical_event.append(f"DTEND;VALUE=DATE:{end}")
-                ical_event.append(f"SUMMARY:{data}")
-
-                # the reminders: ATM hardcoded
-                # TODO: Make reminder times configurable
-                ical_event.append(f"BEGIN:VALARM")
-                ical_event.append("ACTION:DISPLAY")
-                # one week before the event
-                ical_event.append("TRIGGER;VALUE=DURATION:-P1W")
-                ical_event.append("DESCRIPTION:REMINDER")
-                ical_event.append("END:VALARM")
-
-                ical_event.append(f"BEGIN:VALARM")
-                ical_event.append("ACTION:DISPLAY")
-                # when the event starts
-                ical_event.append("TRIGGER;VALUE=DURATION:PT0S")
-                ical_event.append("DESCRIPTION:REMINDER")
-                ical_event.append("END:VALARM")
-
-                ical_event.append(f"END:VEVENT")
-
-                ical_event = "\n".join(ical_event)
-                self.ical_events.append(ical_event)
-
-    ############################################################################
-    def _create_ical_file_content(self):
-        lines = []
-        lines.append("BEGIN:VCALENDAR")
-        lines.append("VERSION:2.0")
-        lines.append("PRODID:anniversary-processor")
-        lines.append("CALSCALE:GREGORIAN")
-        lines.append("METHOD:PUBLISH")
-        lines.append("\n".join(self.ical_events))
-        lines.append("END:VCALENDAR")
-        self.ical_file_content = "\n".join(lines)
-
-    ############################################################################
-    def _write_ical_file(self):
+    def flush(self):
+        """Waits until all queued files are written.
 
-        ical_dir = os.path.join(self.output_dir, "ical", "{}".format(self.year))
-        os.makedirs(ical_dir, exist_ok=True)
-        filename = f"anniversaries__{self.year}.ics"
-        ical_file = os.path.join(ical_dir, filename)
-        with open(ical_file, "w") as fh:
-            fh.write(self.ical_file_content)
+        Returns (file, exception) of the files that failed since the last
+        flush.
+        """
+
+        if self.executor is None:
+            return []
 
-        pass
+        import concurrent.futures
+
+        with self.lock:
+            futures, self.futures = self.futures, []
+        concurrent.futures.wait(futures)
+
+        with self.lock:
+            errors, self.errors = self.errors, []
+
+        return errors
+
+    ############################################################################
+    def _write(self, filename, fh, size, metrics):
+        """Runs in a writer thread."""
+
+        import shutil
+
+        wall, cpu = time.perf_counter(), time.thread_time()
+        unchanged = False
+        try:
+            with fh:
+                unchanged = self._is_unchanged(filename, fh, size)
+                if not unchanged:
+                    fh.seek(0)
+                    with AtomicFile(filename) as out:
+                        shutil.copyfileobj(fh, out)
+        except Exception as ex:
+            with self.lock:
+                self.errors.append((filename, ex))
+        finally:
+            self.slots.release()
+
+        if metrics is not None:
+            metrics.add(
+                "write",
+                time.perf_counter() - wall,
+                time.thread_time() - cpu,
+                bytes=0 if unchanged else size,
+                file=filename,
+                skipped=unchanged,
+            )
+
+    ############################################################################
+    @staticmethod
+    def _is_unchanged(filename, fh, size):
+        """True if filename has the content of fh already."""
+
+        try:
+            if os.path.getsize(filename) != size:
+                return False
+            with open(filename, "rb") as current:
+                while True:
+                    block = fh.read(1024 * 1024)
+                    if block != current.read(1024 * 1024):
+                        return False
+                    if not block:
+                        return True
+        except OSError:
+            return False
+
+
+################################################################################
+################################################################################
+class Metrics:
+    """Wall time, CPU time, entries processed and bytes written per stage.
+
+    A stage is e.g. reading the config or creating the HTML of one month;
+    stages run in worker processes are added with their own measurements.
+    """
+
+    ############################################################################
+    def __init__(self):
+        self.started = datetime.datetime.now()
+        self.stages = []
+
+    ############################################################################
+    @contextlib.contextmanager
+    def stage(self, name, **labels):
+        """Measures the block – the yielded dict takes entries, bytes etc."""
+
+        record = dict(stage=name, **labels)
+        record.update(entries=0, bytes=0)
+        # CPU of this thread only: writers and processors may run in threads
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        finally:
+            record["wall"] = time.perf_counter() - wall
+            record["cpu"] = time.thread_time() - cpu
+            self.stages.append(record)
+
+    ############################################################################
+    def add(self, name, wall, cpu, entries=0, bytes=0, **labels):
+        """Adds a stage measured elsewhere (e.g. in a worker process)."""
+
+        record = dict(stage=name, **labels)
+        record.update(entries=entries, bytes=bytes, wall=wall, cpu=cpu)
+        self.stages.append(record)
+
+    ############################################################################
+    def totals(self):
+        """stage name => summed up count, wall, cpu, entries and bytes."""
+
+        totals = dict()
+        for record in self.stages:
+            total = totals.setdefault(
+                record["stage"],
+                {"count": 0, "wall": 0.0, "cpu": 0.0, "entries": 0, "bytes": 0},
+            )
+            total["count"] += 1
+            for key in ("wall", "cpu", "entries", "bytes"):
+                total[key] += record[key] or 0
+
+        return totals
+
+    ############################################################################
+    def save(self, metrics_file):
+        metrics = {
+            "started": self.started.isoformat(timespec="seconds"),
+            "argv": sys.argv[1:],
+            "totals": self.totals(),
+            "stages": self.stages,
+        }
+
+        with open(metrics_file, "w") as fh:
+            json.dump(metrics, fh, indent=1)
+
+
+################################################################################
+################################################################################
+class BaseProcessor:
+    """This is the base class holding all methods re-used by derived classes."""
+
+    # bump this whenever the layout of the cached entries changes
+    cache_version = 4
+
+    # bump this whenever the output changes for the same input (this makes
+    # all output files stale)
+    output_version = 3
+
+    intervals = ("monthly", "yearly")
+
+    # the index of the anniversaries, see make_index()
+    engine = "auto"
+
+    month_names = {
+        1: "January",
+        2: "February",
+        3: "March",
+        4: "April",
+        5: "May",
+        6: "June",
+        7: "July",
+        8: "August",
+        9: "September",
+        10: "October",
+        11: "November",
+        12: "December",
+    }
+
+    ############################################################################
+    def __init__(
+        self,
+        use_cache=True,
+        rebuild_cache=False,
+        years=None,
+        force=False,
+        entries=None,
+        index=None,
+        sources=None,
+        metrics=None,
+        config_dir=None,
+        output_dir=None,
+        engine="auto",
+        archive=None,
+        writer=None,
+    ):
+        """years are the years to create output for; default: this and next year.
+
+        Output files are only recreated if their inputs changed – or if force
+        is set.
+
+        entries are already loaded anniversaries to use instead of (re-)reading
+        the config; index is their DateIndex if it is prepared already. Both
+        are only read, so several processors can share them.
+
+        sources are additional directories or .cfg/.csv/.vcf files to import
+        the anniversaries from (see read_source()).
+
+        metrics collects the timings of the stages (see Metrics); pass the same
+        object to several processors to get the metrics of the whole run.
+
+        config_dir and output_dir default to etc/ and output/ next to src/.
+
+        engine selects the index of the anniversaries: "python", "numpy" or
+        "auto" (see make_index()).
+
+        archive is an open Archive taking the output files instead of
+        output_dir – then all files are created and output_dir is not touched.
+
+        writer is the FileWriter writing the output files in the background;
+        pass the same object to several processors to share its threads.
+        """
+
+        self.use_cache = use_cache
+        self.rebuild_cache = rebuild_cache
+        self.force = force
+        self.sources = [os.path.abspath(source) for source in sources or []]
+        if years is None:
+            this_year = datetime.datetime.now().year
+            years = range(this_year, this_year + 2)
+        self.years = years
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.engine = engine
+        self.archive = archive
+        self.writer = writer if writer is not None else get_file_writer()
+        self._set_env(config_dir, output_dir)
+
+        with self.metrics.stage("config") as stage:
+            if entries is None:
+                self._load_entries()
+            else:
+                self.entries = entries
+            stage["entries"] = len(self.entries)
+
+        if index is None:
+            with self.metrics.stage("prepare") as stage:
+                self._prepare_data()
+                stage["entries"] = len(self.entries)
+        else:
+            self.index = index
+
+    ############################################################################
+    def _set_env(self, config_dir=None, output_dir=None):
+        script_dir = os.path.dirname(os.path.abspath(sys.argv[0]))
+        self.config_dir = os.path.join(script_dir[:-3], "etc")
+        self.template_dir = os.path.join(script_dir[:-3], "templates")
+        self.output_dir = os.path.join(script_dir[:-3], "output")
+        self.cache_dir = os.path.join(script_dir[:-3], "cache")
+
+        if config_dir is not None:
+            self.config_dir = os.path.abspath(config_dir)
+        if output_dir is not None:
+            self.output_dir = os.path.abspath(output_dir)
+
+    ############################################################################
+    def run(self):
+
+        print("No output from BaseProcessor")
+
+    ############################################################################
+    def _digest(self, parts):
+        """Digest over the given parts – used to detect changed inputs."""
+
+        digest = hashlib.sha256()
+        digest.update("{}".format(self.output_version).encode("utf-8"))
+        for part in parts:
+            digest.update(b"\x00")
+            digest.update("{}".format(part).encode("utf-8"))
+
+        return digest.hexdigest()
+
+    ############################################################################
+    def _is_fresh(self, digest, *paths):
+        # an archive has to contain all files
+        if self.force or self.archive is not None:
+            return False
+
+        return self.manifest.is_fresh(digest, *paths)
+
+    ############################################################################
+    def _save_manifest(self):
+        # the files in output/ did not change when writing to an archive
+        if self.archive is None:
+            self.manifest.save()
+
+    ############################################################################
+    def _write_file(self, filename, data):
+        """Queues data (str or bytes) to be written to filename below output/ –
+        or adds it to the archive. Returns its size in bytes."""
+
+        if self.archive is not None:
+            return self.archive.add(os.path.relpath(filename, self.output_dir), data)
+
+        return self.writer.write(filename, data, self.metrics)
+
+    ############################################################################
+    def _flush_output(self):
+        """Waits until the queued files are written – keeps the errors and
+        drops the failed files from the manifest, so they are created again."""
+
+        for filename, ex in self.writer.flush():
+            self.manifest.discard(filename)
+            self.errors.append("{}: {}".format(filename, ex))
+
+    ############################################################################
+    def _report_errors(self):
+        if self.errors:
+            # one print: processors may report at the same time (see AllProcessor)
+            lines = ["", "{} error(s):".format(len(self.errors))]
+            lines += ["   {}".format(error) for error in self.errors]
+            print("\n".join(lines))
+
+    ############################################################################
+    def _readConfig(self):
+        self.config = dict()
+        # using RawConfigParser with optionxform preserves the case
+        self.config["monthly"] = configparser.RawConfigParser()
+        self.config["monthly"].read(os.path.join(self.config_dir, "monthly.cfg"))
+        self.config["monthly"].optionxform = str
+        self.config["yearly"] = configparser.RawConfigParser()
+        self.config["yearly"].optionxform = str
+        self.config["yearly"].read(os.path.join(self.config_dir, "yearly.cfg"))
+
+    ############################################################################
+    def _load_entries(self):
+        """Get the parsed config entries – from the cache if it is still valid."""
+
+        source_files = self._source_files()
+        signature = self._signature(source_files)
+
+        # one cache file per config dir (and sources) so that several setups do
+        # not collide
+        cache_key = "\x00".join([self.config_dir] + self.sources)
+        cache_key = hashlib.sha1(cache_key.encode("utf-8")).hexdigest()[:16]
+        cache_file = os.path.join(self.cache_dir, "entries-{}.cache".format(cache_key))
+
+        if self.use_cache and not self.rebuild_cache:
+            self.entries = self._read_cache(cache_file, signature)
+            if self.entries is not None:
+                return
+
+        self._readConfig()
+        self._parse_entries()
+        self._import_sources(source_files)
+
+        if self.use_cache:
+            self._write_cache(cache_file, signature)
+
+    ############################################################################
+    def _signature(self, source_files):
+        """The signature of the config files and the given source files."""
+
+        config_files = [
+            os.path.join(self.config_dir, "{}.cfg".format(interval))
+            for interval in self.intervals
+        ]
+
+        return self._config_signature(config_files + source_files)
+
+    ############################################################################
+    def _config_signature(self, config_files):
+        """Path, mtime, size and content hash of each config file."""
+
+        signature = []
+        for config_file in config_files:
+            try:
+                stat = os.stat(config_file)
+                with open(config_file, "rb") as fh:
+                    digest = hashlib.sha256(fh.read()).hexdigest()
+            except FileNotFoundError:
+                signature.append((config_file, None, None, None))
+                continue
+            signature.append((config_file, stat.st_mtime_ns, stat.st_size, digest))
+
+        return tuple(signature)
+
+    ############################################################################
+    def _read_cache(self, cache_file, signature):
+        """Returns the cached entries or None if there is no valid cache."""
+        import pickle
+
+        try:
+            with open(cache_file, "rb") as fh:
+                version, cached_signature, entries = pickle.load(fh)
+        except Exception:
+            # missing, broken or foreign cache file: simply rebuild it
+            return None
+
+        if version != self.cache_version or cached_signature != signature:
+            return None
+
+        return entries
+
+    ############################################################################
+    def _write_cache(self, cache_file, signature):
+        import pickle
+
+        payload = (self.cache_version, signature, self.entries)
+
+        # a concurrent run never reads a half-written cache
+        try:
+            with AtomicFile(cache_file) as fh:
+                pickle.dump(payload, fh, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError as ex:
+            # the cache is an optimization only – never fail because of it
+            print(
+                "Could not write cache {}: {}".format(cache_file, ex), file=sys.stderr
+            )
+
+    ############################################################################
+    def _parse_entries(self):
+        """Flatten the config into a list of Anniversary records."""
+
+        self.entries = []
+
+        # sections looking the same share one Style object
+        self.styles = dict()
+        # section => Style, used for imported anniversaries without own style
+        self.section_styles = dict()
+
+        for interval in self.config.keys():
+
+            for section in self.config[interval].sections():
+
+                if self.config[interval].has_option(section, "symbol"):
+                    symbol = self.config[interval].get(section, "symbol")
+                else:
+                    symbol = "?"
+
+                if self.config[interval].has_option(section, "color"):
+                    color = self.config[interval].get(section, "color")
+                else:
+                    color = "#000000"
+
+                if self.config[interval].has_option(section, "bgcolor"):
+                    bgcolor = self.config[interval].get(section, "bgcolor")
+                else:
+                    bgcolor = "#ffffff"
+
+                remind = None
+                if self.config[interval].has_option(section, "remind"):
+                    tmp = self.config[interval].get(section, "remind")
+                    try:
+                        remind = parse_durations(tmp)
+                    except ValueError as ex:
+                        print(
+                            "Ignoring {}/remind: {}".format(section, ex),
+                            file=sys.stderr,
+                        )
+
+                style = self._style((symbol, color, bgcolor, remind))
+                self.section_styles.setdefault(section, style)
+                section_name = sys.intern(section)
+
+                for option in self.config[interval].options(section):
+                    if option in ["symbol", "color", "bgcolor", "remind"]:
+                        continue
+
+                    tmp = self.config[interval].get(section, option)
+
+                    try:
+                        year, month, day = parse_date(tmp, interval)
+                    except ValueError:
+                        print(
+                            "Ignoring {}/{}: invalid date {}".format(
+                                section, option, tmp
+                            ),
+                            file=sys.stderr,
+                        )
+                        continue
+
+                    self.entries.append(
+                        Anniversary(
+                            section_name, "{}".format(option), style, year, month, day
+                        )
+                    )
+
+    ############################################################################
+    def _style(self, style):
+        """The shared Style object for (symbol, color, bgcolor, remind)."""
+
+        if style not in self.styles:
+            self.styles[style] = Style(*style)
+
+        return self.styles[style]
+
+    ############################################################################
+    def _source_files(self):
+        """The files of self.sources – directories are expanded (not recursive)."""
+
+        source_files = []
+        for source in self.sources:
+            if os.path.isdir(source):
+                for filename in sorted(os.listdir(source)):
+                    if filename.endswith(tuple(source_readers)):
+                        source_files.append(os.path.join(source, filename))
+            else:
+                source_files.append(source)
+
+        return source_files
+
+    ############################################################################
+    def _import_sources(self, source_files):
+        """Adds the anniversaries of the source files to self.entries.
+
+        Larger imports of several files are parsed in parallel processes; the
+        anniversaries are added in the order of the files anyway.
+        """
+
+        if not source_files:
+            return
+
+        total_size = 0
+        for source_file in source_files:
+            try:
+                total_size += os.path.getsize(source_file)
+            except OSError:
+                pass
+
+        workers = min(len(source_files), os.cpu_count() or 1)
+        if total_size < parallel_import_size:
+            workers = 1
+        executor = make_executor(workers)
+
+        import csv
+
+        default_style = ("?", "#000000", "#ffffff", None)
+
+        # (section, style) => (section, Style) – shared by all records
+        resolved = dict()
+
+        report = []
+        with executor:
+            futures = [
+                executor.submit(read_source, source_file)
+                for source_file in source_files
+            ]
+            for source_file, future in zip(source_files, futures):
+                try:
+                    records, section_styles, errors, size, seconds, cpu = (
+                        future.result()
+                    )
+                except (OSError, ValueError, csv.Error, configparser.Error) as ex:
+                    print("Ignoring {}: {}".format(source_file, ex), file=sys.stderr)
+                    continue
+
+                for error in errors:
+                    print("Ignoring {}".format(error), file=sys.stderr)
+
+                for section, style in section_styles.items():
+                    self.section_styles.setdefault(section, self._style(style))
+
+                append = self.entries.append
+                for section, name, style, year, month, day in records:
+                    key = (section, style)
+                    if key not in resolved:
+                        if style is not None:
+                            resolved[key] = (sys.intern(section), self._style(style))
+                        else:
+                            resolved[key] = (
+                                sys.intern(section),
+                                self.section_styles.get(section)
+                                or self._style(default_style),
+                            )
+                    section, style = resolved[key]
+                    append(Anniversary(section, name, style, year, month, day))
+
+                report.append((source_file, len(records), size, seconds))
+                self.metrics.add(
+                    "import",
+                    seconds,
+                    cpu,
+                    entries=len(records),
+                    bytes=size,
+                    file=source_file,
+                )
+
+        self._report_import(report)
+
+    ############################################################################
+    def _report_import(self, report):
+        """Prints the throughput per source file (to stderr, the shell modes
+        print their result to stdout)."""
+
+        for source_file, count, size, seconds in report:
+            seconds = max(seconds, 1e-6)
+            print(
+                "Imported {} anniversaries from {} in {:.2f}s "
+                "({:.0f} entries/s, {:.1f} MB/s)".format(
+                    count,
+                    source_file,
+                    seconds,
+                    count / seconds,
+                    size / seconds / 1e6,
+                ),
+                file=sys.stderr,
+            )
+
+    ############################################################################
+    def _prepare_data(self):
+        self.index = make_index(self.entries, self.engine)
+
+    ############################################################################
+    def _reload_entries_or_keep(self):
+        """Re-reads and prepares the config for a long-running process.
+
+        Returns False if it cannot be read – e.g. while it is being saved –
+        after reporting it; the current anniversaries are kept then.
+        """
+
+        entries, index = self.entries, self.index
+        try:
+            self._load_entries()
+            self._prepare_data()
+        except (configparser.Error, OSError, UnicodeDecodeError) as ex:
+            self.entries, self.index = entries, index
+            print(
+                "Cannot read the config, keeping the anniversaries: {}".format(ex),
+                file=sys.stderr,
+            )
+            return False
+
+        return True
+
+    ############################################################################
+    def occurrences(self, start, end):
+        """Yields (date, anniversary) for all anniversaries from start to end.
+
+        start and end are datetime.date objects (both inclusive); occurrences
+        are produced in date order. Use anniversary.label(date.year) to get
+        the text including the age.
+        """
+
+        return self.index.occurrences(start, end)
+
+    ############################################################################
+    def upcoming(self, start, end):
+        """Returns a list of (date, anniversary) for all anniversaries from start to end.
+
+        start and end are datetime.date objects (both inclusive); the list is
+        sorted by date.
+        """
+
+        return list(self.occurrences(start, end))
+
+    ############################################################################
+    def month_data(self, year, month):
+        """Returns a dict day => list of anniversaries for the given month."""
+
+        return self.index.month_data(year, month)
+
+
+################################################################################
+################################################################################
+class ShellProcessor(BaseProcessor):
+    """This holds the functionality to get anniversaries to your shell."""
+
+    lines = []
+
+    ############################################################################
+    def __init__(self, start=None, end=None, **kwargs):
+        """start and end limit the shown dates; default is -7d to +30d."""
+
+        today = datetime.date.today()
+        self.start = start if start is not None else today - datetime.timedelta(7)
+        self.end = end if end is not None else today + datetime.timedelta(30)
+        # own lines: several shell processors may run in one process (all mode)
+        self.lines = []
+        # not cached if the entries are passed in
+        self.output = None
+        self.output_cache_file = None
+
+        super().__init__(**kwargs)
+
+    ############################################################################
+    def _load_entries(self):
+        """Nothing to load if today's output for this config is cached already."""
+
+        if self.use_cache:
+            self.output_cache_file = self._output_cache_file()
+            if not self.rebuild_cache:
+                try:
+                    with open(self.output_cache_file, "r", encoding="utf-8") as fh:
+                        self.output = fh.read()
+                except OSError:
+                    pass
+                else:
+                    self.entries = []
+                    return
+
+        super()._load_entries()
+
+    ############################################################################
+    def _output_cache_file(self):
+        """The cache file of the output – by processor, day, window and config."""
+
+        key = [
+            self.output_version,
+            datetime.date.today(),
+            self.start,
+            self.end,
+            self.config_dir,
+            self.sources,
+            self._signature(self._source_files()),
+        ]
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:16]
+
+        return os.path.join(
+            self.cache_dir, "{}-{}.txt".format(type(self).__name__.lower(), digest)
+        )
+
+    ############################################################################
+    def run(self):
+        with self.metrics.stage("shell") as stage:
+            if self.output is None:
+                self._build_lines()
+                self.output = "".join(line + "\n" for line in self.lines)
+                stage["entries"] = sum(1 for line in self.lines if line)
+                if self.output_cache_file is not None:
+                    self._write_output_cache()
+            else:
+                stage["cached"] = True
+
+            self._print()
+            stage["bytes"] = len(self.output)
+
+    ############################################################################
+    def _build_lines(self):
+
+        today = datetime.date.today()
+        next_week = today + datetime.timedelta(7)
+
+        self.lines.append("")
+
+        last_time = ""
+
+        for date, entry in self.upcoming(self.start, self.end):
+
+            if date < today:
+                cur_time = "last_week"
+            elif date == today:
+                cur_time = "today"
+            elif date <= next_week:
+                cur_time = "next_week"
+            else:
+                cur_time = "next_month"
+
+            if last_time and last_time != cur_time:
+                self.lines.append("")
+
+            date_ext = "{} ({})".format(date.isoformat(), date.strftime("%a"))
+            line = "{}:    {} {}".format(
+                date_ext, entry.style.symbol, entry.label(date.year)
+            )
+            line = self._prepare_line(line, cur_time)
+
+            self.lines.append(line)
+
+            last_time = cur_time
+
+        self.lines.append("")
+
+    ############################################################################
+    def _prepare_line(self, line, line_time):
+        """Use this method in your derived classes to e.g. colorize the lines."""
+
+        return line
+
+    ############################################################################
+    def _print(self):
+        sys.stdout.write(self.output)
+
+    ############################################################################
+    def _write_output_cache(self):
+        """Writes self.output to its cache file and drops the outdated ones."""
+
+        prefix = "{}-".format(type(self).__name__.lower())
+
+        try:
+            with AtomicFile(self.output_cache_file, "w", encoding="utf-8") as fh:
+                fh.write(self.output)
+
+            for filename in os.listdir(self.cache_dir):
+                cache_file = os.path.join(self.cache_dir, filename)
+                if filename.startswith(prefix) and filename.endswith(".txt"):
+                    if cache_file != self.output_cache_file:
+                        os.unlink(cache_file)
+        except OSError as ex:
+            # the cache is an optimization only – never fail because of it
+            print(
+                "Could not write cache {}: {}".format(self.output_cache_file, ex),
+                file=sys.stderr,
+            )
+
+    ############################################################################
+    def test_output(self):
+
+        testlines = []
+        print(self._prepare_line("last_week", "last_week"))
+        print(self._prepare_line("today", "today"))
+        print(self._prepare_line("next_week", "next_week"))
+        print(self._prepare_line("next_month", "next_month"))
+
+
+################################################################################
+################################################################################
+class BashProcessor(ShellProcessor):
+    """This holds the functionality to get anniversaries to your bash."""
+
+    ############################################################################
+    def _prepare_line(self, line, line_time):
+        """Use this method in your derived classes to e.g. colorize the lines."""
+
+        colors = {
+            "last_week": "\033[0;31m",
+            "today": "\033[1;31m",
+            "next_week": "\033[0;32m",
+            "next_month": "\033[0;36m",
+            "clear": "\033[0m",
+        }
+
+        line = colors[line_time] + line + colors["clear"]
+
+        return line
+
+
+################################################################################
+################################################################################
+class PowershellProcessor(ShellProcessor):
+    """This holds the functionality to get anniversaries to your powershell."""
+
+    ############################################################################
+    def _prepare_line(self, line, line_time):
+        """Use this method in your derived classes to e.g. colorize the lines."""
+
+        colors = {
+            "last_week": "last week    ",
+            "today": "TODAY!!      ",
+            "next_week": "next week    ",
+            "next_month": "next month   ",
+            "clear": "",
+        }
+
+        line = colors[line_time] + line + colors["clear"]
+
+        return line
+
+
+################################################################################
+################################################################################
+class HtmlProcessor(BaseProcessor):
+
+    # (year, month) => calendar grid, see calendar_grid()
+    calendar_grids = dict()
+
+    # template file => (mtime, size, text) – shared by all processors
+    templates = dict()
+
+    ############################################################################
+    def run(self, ready=None):
+        """ready is called with year, HTML file and HTML of every month as soon
+        as the file is written (the HTML is None if it was found up to date) –
+        e.g. to render it to PDF.
+        """
+
+        self.errors = []
+
+        with self.metrics.stage("template"):
+            self._read_template()
+        self.manifest = Manifest(self.output_dir)
+
+        for self.year in self.years:
+            for self.month in range(1, 13):
+                basename = "{}-{:02d}".format(self.year, self.month)
+                html_file = os.path.join(
+                    self.output_dir, "html", "{}".format(self.year), basename + ".htm"
+                )
+
+                html = None
+                with self.metrics.stage("html", month=basename) as stage:
+                    digest = self._month_digest()
+                    if self._is_fresh(digest, html_file):
+                        stage["skipped"] = True
+                    else:
+                        self._create_html()
+                        html = self.html
+                        stage["bytes"] = self._write_html(basename)
+                        self.manifest.update(digest, html_file)
+                        stage["entries"] = self.month_entries
+
+                if ready is not None:
+                    ready(self.year, html_file, html)
+
+        self._flush_output()
+        self._save_manifest()
+        self._report_errors()
+
+    ############################################################################
+    def _read_template(self):
+        tpl_file = os.path.join(self.template_dir, "html", "month.tpl.htm")
+
+        stat = os.stat(tpl_file)
+        cached = self.templates.get(tpl_file)
+        if cached is None or cached[:2] != (stat.st_mtime_ns, stat.st_size):
+            with open(tpl_file, "r") as fh:
+                cached = (stat.st_mtime_ns, stat.st_size, fh.read())
+            self.templates[tpl_file] = cached
+
+        self.template = cached[2]
+        self.month_template = MonthTemplate.compile(self.template)
+        # rendered start of an entry by its style
+        self.entry_prefixes = dict()
+
+    ############################################################################
+    def _month_digest(self):
+        """Digest of everything the HTML of self.year/self.month is made of."""
+
+        parts = [self.template, self.year, self.month]
+        for day, entries in sorted(self.month_data(self.year, self.month).items()):
+            for entry in entries:
+                parts += [
+                    day,
+                    entry.style.symbol,
+                    entry.style.color,
+                    entry.style.bgcolor,
+                    entry.label(self.year),
+                ]
+
+        return self._digest(parts)
+
+    ############################################################################
+    @classmethod
+    def calendar_grid(cls, year, month):
+        """Returns the weeks of the month as tuple of (ISO week number, days).
+
+        days are the seven days (Monday first) of the week, 0 for days not in
+        this month. The grids of all months of a year are built at once and
+        shared by all processors of the process.
+        """
+
+        if (year, month) not in cls.calendar_grids:
+            import calendar
+
+            for cur_month in range(1, 13):
+                weeks = []
+                for week in calendar.monthcalendar(year, cur_month):
+                    day = next(day for day in week if day > 0)
+                    iso_week = datetime.date(year, cur_month, day).isocalendar()[1]
+                    weeks.append((iso_week, tuple(week)))
+                cls.calendar_grids[(year, cur_month)] = tuple(weeks)
+
+        return cls.calendar_grids[(year, month)]
+
+    ############################################################################
+    def _create_html(self):
+
+        month_grid = self.calendar_grid(self.year, self.month)
+
+        month_data = self.month_data(self.year, self.month)
+        self.month_entries = sum(len(entries) for entries in month_data.values())
+
+        out = []
+        self.month_template.render(
+            out,
+            {
+                "month": "{}".format(self.month_names[self.month]),
+                "year": "{}".format(self.year),
+                "calendar_data": lambda out: self._render_calendar(
+                    out, month_grid, month_data
+                ),
+            },
+        )
+
+        self.html = "".join(out)
+
+    ############################################################################
+    def _render_calendar(self, out, month_grid, month_data):
+        """Appends the table rows of the month to out."""
+
+        append = out.append
+        entry_prefix = self._entry_prefix
+
+        separator = ""
+        for week_number, week in month_grid:
+
+            append(separator)
+            separator = "\n"
+
+            append("<tr>\n<td><br><br>")
+            append("\n{}".format(week_number))  # ISO week number
+            append("\n</td>")
+
+            for day in week:
+                if day == 0:
+                    append("\n<td></td>")
+                    continue
+
+                append('\n<td><div class="inner_head">{}</div>'.format(day))
+
+                if day in month_data:
+                    append('<div class="inner_content">')
+                    append(
+                        "<br>".join(
+                            entry_prefix(entry.style)
+                            + entry.label(self.year)
+                            + "</span>"
+                            for entry in month_data[day]
+                        )
+                    )
+                    append("</div>")
+
+                append("</td>")
+
+            append("\n</tr>")
+
+    ############################################################################
+    def _entry_prefix(self, style):
+        """The start of an entry in the given style – rendered once per style."""
+
+        prefix = self.entry_prefixes.get(style)
+        if prefix is None:
+            prefix = '<span style="color: {}; background-color: {};"><span class="inner_content_marker">{}</span> '.format(
+                style.color, style.bgcolor, style.symbol
+            )
+            self.entry_prefixes[style] = prefix
+
+        return prefix
+
+    ############################################################################
+    def _create_year_html(self):
+        """Puts all months of self.year into one HTML document (one page each)."""
+
+        bodies = []
+        for self.month in range(1, 13):
+            self._create_html()
+            head, _, rest = self.html.partition("<body>")
+            body, _, tail = rest.partition("</body>")
+            bodies.append(
+                '<section class="month" id="month-{:02d}">{}</section>'.format(
+                    self.month, body
+                )
+            )
+
+        self.html = head + "<body>" + "\n".join(bodies) + "</body>" + tail
+
+    ############################################################################
+    def _write_html(self, filename):
+        """Writes self.html – returns its size in bytes."""
+
+        if not filename.endswith(".htm") or not filename.endswith(".html"):
+            filename += ".htm"
+        html_dir = os.path.join(self.output_dir, "html", "{}".format(self.year))
+        html_file = os.path.join(html_dir, filename)
+
+        return self._write_file(html_file, self.html)
+
+
+################################################################################
+################################################################################
+class PdfProcessor(HtmlProcessor):
+
+    html_dir = None
+    pdf_dir = None
+
+    ############################################################################
+    def __init__(self, jobs=1, single_pass=False, **kwargs):
+        """jobs is the number of processes rendering/converting in parallel.
+
+        With single_pass the HTML of each year is created in memory and
+        rendered as one document instead of reading the monthly HTML files.
+        """
+
+        self.jobs = jobs
+        self.single_pass = single_pass
+
+        super().__init__(**kwargs)
+
+    ############################################################################
+    def run(self):
+        with self.pipeline():
+            pass
+
+    ############################################################################
+    @contextlib.contextmanager
+    def pipeline(self, streamed=False):
+        """Queues the PDF files of all years, then runs the body of the with
+        statement while they are rendered and finally collects them.
+
+        With streamed the months are rendered as soon as their HTML files are
+        written: the with statement gets year => queue and the body has to put
+        the HTML of each year (see html_source()) to its queue in order. Years
+        up to date have no queue. Without streamed the HTML files have to
+        exist already (or single_pass or archive is set).
+
+        The unit of work is the year: its year file is made of the pages of
+        its months, so they have to be laid out in one process.
+        """
+
+        self.errors = []
+
+        with self.metrics.stage("template"):
+            self._read_template()
+        self.manifest = Manifest(self.output_dir)
+
+        with contextlib.ExitStack() as stack:
+            new_queue = None
+            if not streamed or self.single_pass:
+                executor = make_executor(self.jobs)
+            elif self.jobs > 1:
+                import multiprocessing
+
+                executor = make_executor(self.jobs)
+                # plain multiprocessing queues cannot be passed to pool workers
+                new_queue = stack.enter_context(multiprocessing.Manager()).Queue
+            else:
+                import concurrent.futures
+                import queue
+
+                # a streamed render has to wait for the HTML: not in this thread
+                executor = concurrent.futures.ThreadPoolExecutor(1)
+                new_queue = queue.Queue
+            stack.enter_context(executor)
+
+            # queue all years first to keep all workers busy
+            year_pdfs = dict()
+            html_queues = dict()
+            for self.year in self.years:
+                self._set_dirs()
+                html_queue = new_queue() if new_queue is not None else None
+                year_pdfs[self.year] = self._make_year_pdf(executor, html_queue)
+                if year_pdfs[self.year] is not None and html_queue is not None:
+                    html_queues[self.year] = html_queue
+
+            try:
+                yield html_queues
+            finally:
+                # end the queues – a render missing months fails then
+                for html_queue in html_queues.values():
+                    html_queue.put(None)
+
+            # everything else is reported in order to keep the output stable
+            ps_files = []
+            for self.year in self.years:
+                self._set_dirs()
+
+                if year_pdfs[self.year] is None:
+                    continue
+
+                year_file, pdf_files, digest, future = year_pdfs[self.year]
+                if not self._check_result(future, year_file):
+                    continue
+
+                errors, seconds, timings, files = future.result()
+                pdf_data = dict(files)
+                for stage, pdf_file, wall, cpu in timings:
+                    size = len(pdf_data.get(pdf_file, b""))
+                    self.metrics.add(stage, wall, cpu, bytes=size, file=pdf_file)
+                if errors:
+                    self.errors += errors
+                    print()
+                    print("Not creating {}: some months failed".format(year_file))
+                    continue
+
+                print()
+                print("Assembled {} in-process in {:.2f}s".format(year_file, seconds))
+
+                for pdf_file, data in files:
+                    self._write_file(pdf_file, data)
+                self.manifest.update(digest, year_file, *pdf_files)
+
+                # for some reason the created PDF is looking perfectly fine but once
+                # printed the table only fills a part of the page
+                # converting to PS as a workaround here (that gets printed fine)
+                ps_files += [
+                    (ps_file, future, digest)
+                    for ps_file, future in self._convert_to_ps(executor, pdf_data)
+                ]
+
+            for ps_file, future, digest in ps_files:
+                if self._check_result(future, ps_file):
+                    self.manifest.update(digest, ps_file)
+                    wall, cpu, ps_data = future.result()
+                    size = self._write_file(ps_file, ps_data)
+                    self.metrics.add("pdf2ps", wall, cpu, bytes=size, file=ps_file)
+
+        self._flush_output()
+        self._save_manifest()
+        self._report_errors()
+
+    ############################################################################
+    def _set_dirs(self):
+        self.html_dir = os.path.join(self.output_dir, "html", "{}".format(self.year))
+        self.pdf_dir = os.path.join(self.output_dir, "pdf", "{}".format(self.year))
+
+    ############################################################################
+    def _check_result(self, future, filename):
+        """Waits for the given task; returns False (and keeps the error) on failure."""
+
+        try:
+            future.result()
+        except Exception as ex:
+            self.errors.append("{}: {}".format(filename, ex))
+            return False
+
+        return True
+
+    ############################################################################
+    def html_source(self, html_file, html):
+        """The arguments of weasyprint.HTML() rendering a month: the HTML itself
+        – the file may still be queued for writing (or go to an archive) – or
+        the HTML file if html is None as it was up to date.
+        """
+
+        if html is None:
+            return {"filename": html_file}
+
+        return {"string": html, "base_url": os.path.join(self.template_dir, "html")}
+
+    ############################################################################
+    def _year_digest(self):
+        """Digest of everything the PDF files of self.year are made of."""
+
+        parts = [PDF_PAGE_CSS, self.single_pass]
+        for self.month in range(1, 13):
+            parts.append(self._month_digest())
+
+        return self._digest(parts)
+
+    ############################################################################
+    def _make_year_pdf(self, executor, html_queue=None):
+        """Queues the PDF files of self.year – returns None if they are up to date.
+
+        With html_queue the HTML of the months is taken from it (see
+        make_year_pdf_from_queue()) instead of being read right away.
+        """
+
+        pdf_files = []
+        ps_files = []
+        for month in range(1, 13):
+            basename = "{}-{:02d}".format(self.year, month)
+            pdf_files.append(os.path.join(self.pdf_dir, basename + ".pdf"))
+            ps_files.append(os.path.join(self.pdf_dir, "print__" + basename + ".ps"))
+
+        year_file = os.path.join(self.pdf_dir, "{}.pdf".format(self.year))
+
+        digest = self._year_digest()
+        if self._is_fresh(digest, year_file, *pdf_files, *ps_files):
+            print()
+            print("Up to date: {}".format(year_file))
+            return None
+
+        for pdf_file in pdf_files + [year_file]:
+            print()
+            print("Creating {}".format(pdf_file))
+
+        if self.single_pass:
+            with self.metrics.stage("year_html", year=self.year) as stage:
+                self._create_year_html()
+                stage["bytes"] = len(self.html)
+            base_url = os.path.join(self.template_dir, "html")
+            future = executor.submit(
+                make_year_pdf_single_pass, self.html, base_url, pdf_files, year_file
+            )
+        elif html_queue is not None:
+            future = executor.submit(
+                make_year_pdf_from_queue, html_queue, pdf_files, year_file
+            )
+        else:
+            future = executor.submit(
+                make_year_pdf, self._html_sources(), pdf_files, year_file
+            )
+
+        return year_file, pdf_files, digest, future
+
+    ############################################################################
+    def _html_sources(self):
+        """The HTML sources of the months of self.year (see html_source()).
+
+        With an archive the HTML is created in memory instead of read from its
+        files.
+        """
+
+        html_sources = []
+        for self.month in range(1, 13):
+            basename = "{}-{:02d}.htm".format(self.year, self.month)
+            html = None
+            if self.archive is not None:
+                self._create_html()
+                html = self.html
+            html_sources.append(
+                self.html_source(os.path.join(self.html_dir, basename), html)
+            )
+
+        return html_sources
+
+    ############################################################################
+    def _convert_to_ps(self, executor, pdf_data):
+        """Queues the conversion of the monthly PDF files of self.year to PS.
+
+        pdf_data are file => PDF of the files just created.
+        """
+
+        ps_files = []
+
+        for f in sorted(os.path.basename(pdf_file) for pdf_file in pdf_data):
+            if f.endswith(".pdf") and "-" in f:
+                pdf_file = os.path.join(self.pdf_dir, f)
+                ps_file = f"print__{f}".replace(".pdf", ".ps")
+                ps_file = os.path.join(self.pdf_dir, ps_file)
+
+                print()
+                print(f"Converting to .ps: {pdf_file}")
+                ps_files.append(
+                    (ps_file, executor.submit(convert_to_ps, pdf_data[pdf_file]))
+                )
+
+        f = os.path.join(
+            self.pdf_dir,
+            "print__each_month_from_ps_files_one_by_one_to_avoid_problems_with_size",
+        )
+        self._write_file(f, b"")
+
+        return ps_files
+
+
+################################################################################
+################################################################################
+class IcalProcessor(BaseProcessor):
+    """This holds the functionality to get anniversaries to an ical file."""
+
+    default_alarms = ("-P1W", "PT0S")
+
+    # the UIDs are derived from section, name and date within this namespace:
+    # uuid.uuid5(uuid.NAMESPACE_OID, "anniversary-processor")
+    uid_namespace = bytes.fromhex("b3115ae81c515c599155314200807a44")
+
+    ############################################################################
+    def __init__(self, rrule=False, alarms=None, delta=False, **kwargs):
+        """With rrule one recurring event per anniversary is written to one file
+        instead of one event per occurrence to one file per year.
+
+        alarms are the triggers (durations relative to the event start) of the
+        reminders; default: one week before and when the event starts.
+
+        With delta only the events added or changed since the last run (and
+        cancellations for the removed ones) are written.
+        """
+
+        self.rrule = rrule
+        self.alarms = self.default_alarms if alarms is None else tuple(alarms)
+        self.delta = delta
+
+        super().__init__(**kwargs)
+
+    ############################################################################
+    def run(self):
+        self.errors = []
+        self.manifest = Manifest(self.output_dir)
+        self._read_snapshot()
+
+        if self.delta:
+            with self.metrics.stage("ical_delta"):
+                self._write_delta()
+        elif self.rrule:
+            ical_file = os.path.join(self.output_dir, "ical", "anniversaries.ics")
+
+            with self.metrics.stage("ical", year="rrule") as stage:
+                digest = self._rrule_digest()
+                if self._is_fresh(digest, ical_file):
+                    self._keep_snapshot("rrule")
+                    stage["skipped"] = True
+                else:
+                    events = self._create_rrule_events()
+                    stage["bytes"] = self._write_ical_file(
+                        ical_file, self._publish("rrule", events)
+                    )
+                    self.manifest.update(digest, ical_file)
+                    stage["entries"] = len(self.new_snapshot["rrule"])
+        else:
+            for self.year in self.years:
+                ical_file = self._ical_file()
+                group = str(self.year)
+
+                with self.metrics.stage("ical", year=self.year) as stage:
+                    digest = self._year_digest()
+                    if self._is_fresh(digest, ical_file):
+                        self._keep_snapshot(group)
+                        stage["skipped"] = True
+                        continue
+
+                    events = self._create_ical_events()
+                    stage["bytes"] = self._write_ical_file(
+                        ical_file, self._publish(group, events)
+                    )
+                    self.manifest.update(digest, ical_file)
+                    stage["entries"] = len(self.new_snapshot[group])
+
+        self._flush_output()
+        self._write_snapshot()
+        self._save_manifest()
+        self._report_errors()
+
+    ############################################################################
+    def _ical_file(self):
+        ical_dir = os.path.join(self.output_dir, "ical", "{}".format(self.year))
+        filename = f"anniversaries__{self.year}.ics"
+        return os.path.join(ical_dir, filename)
+
+    ############################################################################
+    def _year_digest(self):
+        """Digest of everything the ical file of self.year is made of."""
+
+        parts = [self.year, self.alarms]
+        first_day = datetime.date(self.year, 1, 1)
+        last_day = datetime.date(self.year, 12, 31)
+        for date, event in self.occurrences(first_day, last_day):
+            parts += [
+                date,
+                event.section,
+                event.style.symbol,
+                event.style.remind,
+                event.label(self.year),
+            ]
+
+        return self._digest(parts)
+
+    ############################################################################
+    def _rrule_digest(self):
+        """Digest of everything the recurring ical file is made of."""
+
+        parts = ["rrule", self.years[0], self.alarms]
+        for entry in self.entries:
+            parts += [
+                entry.section,
+                entry.style.symbol,
+                entry.style.remind,
+                entry.name,
+                entry.year,
+                entry.month,
+                entry.day,
+            ]
+
+        return self._digest(parts)
+
+    ############################################################################
+    def _uid(self, section, name, date):
+        """The same anniversary on the same date always gets the same UID.
+
+        This is uuid.uuid5() – without creating UUID objects, which takes most
+        of the time for the events of a year.
+        """
+
+        key = "{}|{}|{}".format(section, name, date).encode("utf-8")
+        uid = bytearray(hashlib.sha1(self.uid_namespace + key).digest()[:16])
+        uid[6] = uid[6] & 0x0F | 0x50  # version 5
+        uid[8] = uid[8] & 0x3F | 0x80  # RFC 4122 variant
+        uid = uid.hex()
+
+        return "{}-{}-{}-{}-{}".format(
+            uid[:8], uid[8:12], uid[12:16], uid[16:20], uid[20:]
+        )
+
+    ############################################################################
+    def _create_ical_events(self):
+        """Yields (uid, start, summary, body) for each occurrence in self.year."""
+
+        first_day = datetime.date(self.year, 1, 1)
+        last_day = datetime.date(self.year, 12, 31)
+        for date, event in self.occurrences(first_day, last_day):
+            start = date.isoformat()
+            end = self._day_after(date, "%Y-%m-%d")
+            data = event.style.symbol + " " + event.label(self.year)
+
+            event_uid = self._uid(event.section, event.name, start)
+            body = self._create_ical_event(
+                start, end, data, alarms=event.style.triggers(self.alarms)
+            )
+            yield event_uid, start, data, body
+
+    ############################################################################
+    def _create_rrule_events(self):
+        """Yields (uid, start, summary, body) for each anniversary (recurring)."""
+
+        for entry in self.entries:
+            date = self._first_occurrence(entry)
+            if date is None:
+                continue
+
+            start = date.strftime("%Y%m%d")
+            end = self._day_after(date, "%Y%m%d")
+            data = entry.style.symbol + " " + entry.name
+
+            if entry.month is None:
+                rrule = "FREQ=MONTHLY"
+                key = "--{:02d}".format(entry.day)
+            else:
+                rrule = "FREQ=YEARLY"
+                key = "{:02d}-{:02d}".format(entry.month, entry.day)
+
+            description = None
+            if entry.year is not None:
+                description = "since {}".format(entry.year)
+
+            event_uid = self._uid(entry.section, entry.name, key)
+            body = self._create_ical_event(
+                start, end, data, rrule, description, entry.style.triggers(self.alarms)
+            )
+            yield event_uid, start, data, body
+
+    ############################################################################
+    @staticmethod
+    def _day_after(date, date_format):
+        """The (exclusive) end of an event on date – None after 9999-12-31, the
+        event lasts that one day without DTEND then.
+        """
+
+        try:
+            return (date + datetime.timedelta(days=1)).strftime(date_format)
+        except OverflowError:
+            return None
+
+    ############################################################################
+    def _first_occurrence(self, entry):
+        """The date a recurring event starts – None if there is no valid one."""
+
+        year = entry.year if entry.year is not None else self.years[0]
+        month = entry.month or 1
+
+        # e.g. 02-29 needs a leap year, monthly 31 a long month
+        for _ in range(12 * 8):
+            try:
+                return datetime.date(year, month, entry.day)
+            except ValueError:
+                pass
+            if entry.month is None and month < 12:
+                month += 1
+            else:
+                year += 1
+                month = entry.month or 1
+
+        return None
+
+    ############################################################################
+    def _create_ical_event(
+        self, start, end, data, rrule=None, description=None, alarms=None
+    ):
+        """The lines of an event describing date, summary and reminders.
+
+        alarms are the reminder triggers of the event, default: self.alarms.
+        """
+
+        ical_event = []
+
+        # date and information for the event
+        ical_event.append(f"DTSTART;VALUE=DATE:{start}")
+        if end is not None:
+            ical_event.append(f"DTEND;VALUE=DATE:{end}")
+        if rrule:
+            ical_event.append(f"RRULE:{rrule}")
+        ical_event.append(f"SUMMARY:{data}")
+        if description:
+            ical_event.append(f"DESCRIPTION:{description}")
+
+        # the reminders: durations relative to the start of the event
+        for trigger in self.alarms if alarms is None else alarms:
+            ical_event.append(f"BEGIN:VALARM")
+            ical_event.append("ACTION:DISPLAY")
+            ical_event.append(f"TRIGGER;VALUE=DURATION:{trigger}")
+            ical_event.append("DESCRIPTION:REMINDER")
+            ical_event.append("END:VALARM")
+
+        return "\n".join(ical_event)
+
+    ############################################################################
+    def _render_event(self, event_uid, sequence, body, *extra):
+        ical_event = [f"BEGIN:VEVENT", f"UID:{event_uid}", f"SEQUENCE:{sequence}"]
+        ical_event += extra
+        ical_event.append(body)
+        ical_event.append(f"END:VEVENT")
+
+        return "\n".join(ical_event)
+
+    ############################################################################
+    def _read_snapshot(self):
+        """The events of the last run: group => uid => [digest, sequence, start,
+        summary]; the groups are the years (or "rrule")."""
+
+        self.snapshot_file = os.path.join(self.output_dir, "ical", "snapshot.json")
+        try:
+            with open(self.snapshot_file, "r") as fh:
+                self.snapshot = json.load(fh)
+        except (OSError, ValueError):
+            self.snapshot = dict()
+
+        self.new_snapshot = dict()
+
+    ############################################################################
+    def _keep_snapshot(self, group):
+        self.new_snapshot[group] = self.snapshot.get(group, dict())
+
+    ############################################################################
+    def _write_snapshot(self):
+        # the snapshot describes the files in output/ – they did not change
+        if not self.new_snapshot or self.archive is not None:
+            return
+
+        snapshot = dict(self.snapshot)
+        snapshot.update(self.new_snapshot)
+
+        with AtomicFile(self.snapshot_file, "w") as fh:
+            json.dump(snapshot, fh, sort_keys=True)
+
+    ############################################################################
+    def _sequence(self, group, event_uid, start, summary, body):
+        """Returns the SEQUENCE of the event and its entry in the last snapshot.
+
+        The sequence is incremented whenever the event changed.
+        """
+
+        digest = hashlib.sha1(body.encode("utf-8")).hexdigest()
+        event_uid = "{}".format(event_uid)
+
+        previous = self.snapshot.get(group, dict()).get(event_uid)
+        if previous is None:
+            sequence = 0
+        elif previous[0] == digest:
+            sequence = previous[1]
+        else:
+            sequence = previous[1] + 1
+
+        group_snapshot = self.new_snapshot.setdefault(group, dict())
+        group_snapshot[event_uid] = [digest, sequence, start, summary]
+
+        return sequence, previous
+
+    ############################################################################
+    def _publish(self, group, events):
+        """Yields the rendered events – all of them."""
+
+        self.new_snapshot[group] = dict()
+        for event_uid, start, summary, body in events:
+            sequence, _ = self._sequence(group, event_uid, start, summary, body)
+            yield self._render_event(event_uid, sequence, body)
+
+    ############################################################################
+    def _write_delta(self):
+        """Writes the changes since the last run: added and changed events to
+        anniversaries__delta.ics, removed ones to anniversaries__cancel.ics."""
+
+        if self.rrule:
+            groups = [("rrule", self._create_rrule_events)]
+        else:
+            groups = []
+            for year in self.years:
+                groups.append((str(year), self._year_events(year)))
+
+        delta_dir = os.path.join(self.output_dir, "ical", "delta")
+        stamp = datetime.datetime.now(datetime.timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        counts = {"added": 0, "changed": 0, "cancelled": 0}
+
+        def changed_events():
+            for group, events in groups:
+                self.new_snapshot[group] = dict()
+                for event_uid, start, summary, body in events():
+                    sequence, previous = self._sequence(
+                        group, event_uid, start, summary, body
+                    )
+                    if previous is None:
+                        counts["added"] += 1
+                    elif previous[1] != sequence:
+                        counts["changed"] += 1
+                    else:
+                        continue
+                    yield self._render_event(
+                        event_uid, sequence, body, f"DTSTAMP:{stamp}"
+                    )
+
+        def cancelled_events():
+            for group, _ in groups:
+                current = self.new_snapshot[group]
+                for event_uid, previous in self.snapshot.get(group, dict()).items():
+                    if event_uid in current:
+                        continue
+                    counts["cancelled"] += 1
+                    _, sequence, start, summary = previous
+                    body = f"DTSTART;VALUE=DATE:{start}\nSUMMARY:{summary}"
+                    yield self._render_event(
+                        event_uid,
+                        sequence + 1,
+                        body,
+                        f"DTSTAMP:{stamp}",
+                        "STATUS:CANCELLED",
+                    )
+
+        self._write_ical_file(
+            os.path.join(delta_dir, "anniversaries__delta.ics"), changed_events()
+        )
+        self._write_ical_file(
+            os.path.join(delta_dir, "anniversaries__cancel.ics"),
+            cancelled_events(),
+            method="CANCEL",
+        )
+
+        print(
+            "{added} added, {changed} changed, {cancelled} cancelled".format(**counts)
+        )
+
+    ############################################################################
+    def _year_events(self, year):
+        def events():
+            self.year = year
+            return self._create_ical_events()
+
+        return events
+
+    ############################################################################
+    def _write_ical_file(self, ical_file, ical_events, method="PUBLISH"):
+        """Streams the events to the file (queued, see FileWriter) or the
+        archive as they are created. Returns the size of the file in bytes.
+        """
+
+        chunks = self._ical_chunks(ical_events, method)
+        if self.archive is not None:
+            return self.archive.add_chunks(
+                os.path.relpath(ical_file, self.output_dir), chunks
+            )
+
+        return self.writer.write_chunks(ical_file, chunks, self.metrics)
+
+    ############################################################################
+    def _ical_chunks(self, ical_events, method="PUBLISH"):
+        """Yields the calendar piece by piece."""
+
+        yield "BEGIN:VCALENDAR\n"
+        yield "VERSION:2.0\n"
+        yield "PRODID:anniversary-processor\n"
+        yield "CALSCALE:GREGORIAN\n"
+        yield "METHOD:{}\n".format(method)
+        separator = ""
+        for ical_event in ical_events:
+            yield separator
+            yield ical_event
+            separator = "\n"
+        yield "\nEND:VCALENDAR"
+
+
+################################################################################
+################################################################################
+class ServeProcessor(HtmlProcessor, IcalProcessor):
+    """This serves HTML, ICAL and upcoming anniversaries via HTTP from memory."""
+
+    html_regex = re.compile(r"/html/([0-9]{4})-([0-9]{2})(?:\.html?)?")
+    ical_regex = re.compile(r"/ical/([0-9]{4})\.ics")
+
+    # seconds between two checks for changed config files or template
+    check_interval = 1.0
+
+    # rendered responses kept – the oldest is dropped first
+    max_responses = 256
+
+    ############################################################################
+    def __init__(self, host="127.0.0.1", port=8080, **kwargs):
+        """Responses are rendered on first request and kept until the config or
+        the template changes – which is picked up without a restart.
+        """
+
+        import threading
+
+        self.host = host
+        self.port = port
+
+        # requests are handled in threads, rendering changes self.year etc.
+        self.lock = threading.Lock()
+        # cache key => (etag, content type, body)
+        self.responses = dict()
+
+        super().__init__(**kwargs)
+
+        self._read_template()
+        self._read_snapshot()
+        self.watched = self._watched_state()
+        self.checked = time.monotonic()
+
+    ############################################################################
+    def run(self):
+        import http.server
+
+        handler = type(
+            "RequestHandler",
+            (ServeRequestHandler, http.server.BaseHTTPRequestHandler),
+            dict(),
+        )
+        server = http.server.ThreadingHTTPServer((self.host, self.port), handler)
+        server.processor = self
+
+        print("Serving on http://{}:{}/".format(self.host, self.port))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    ############################################################################
+    def response(self, path, query=""):
+        """Returns (etag, content type, body) for the path – None if unknown.
+
+        Raises ValueError for invalid query parameters.
+        """
+
+        with self.lock:
+            self._reload_if_changed()
+
+            route = self._route(path, query)
+            if route is None:
+                return None
+            key, render = route
+
+            response = self.responses.get(key)
+            if response is None:
+                content_type, body = render()
+                etag = '"{}"'.format(hashlib.sha256(body).hexdigest()[:32])
+                response = (etag, content_type, body)
+                if len(self.responses) >= self.max_responses:
+                    del self.responses[next(iter(self.responses))]
+                self.responses[key] = response
+
+        return response
+
+    ############################################################################
+    def _route(self, path, query):
+        """Returns (cache key, render function) for the path or None."""
+
+        import urllib.parse
+
+        match = self.html_regex.fullmatch(path)
+        if match:
+            year, month = int(match.group(1)), int(match.group(2))
+            if year < 1 or not 1 <= month <= 12:
+                return None
+            return ("html", year, month), lambda: self._render_html(year, month)
+
+        match = self.ical_regex.fullmatch(path)
+        if match:
+            year = int(match.group(1))
+            if year < 1:
+                return None
+            return ("ical", year), lambda: self._render_ical(year)
+
+        if path in ("/upcoming", "/upcoming.json"):
+            start, end = self._upcoming_window(urllib.parse.parse_qs(query))
+            return ("upcoming", start, end), lambda: self._render_upcoming(start, end)
+
+        return None
+
+    ############################################################################
+    def _upcoming_window(self, params):
+        """start and end from the parameters from, to and days – the defaults
+        are the same as for the shell modes."""
+
+        today = datetime.date.today()
+
+        def param(name, convert):
+            if name not in params:
+                return None
+            try:
+                return convert(params[name][-1])
+            except ValueError:
+                raise ValueError("invalid {}: {}".format(name, params[name][-1]))
+
+        start = param("from", datetime.date.fromisoformat)
+        end = param("to", datetime.date.fromisoformat)
+        days = param("days", int)
+
+        try:
+            if days is not None:
+                end = (start or today) + datetime.timedelta(days)
+            if start is None:
+                start = today - datetime.timedelta(7)
+            if end is None:
+                end = today + datetime.timedelta(30)
+        except OverflowError:
+            raise ValueError("window out of range")
+
+        return start, end
+
+    ############################################################################
+    def _render_html(self, year, month):
+        self.year, self.month = year, month
+        self._create_html()
+
+        return "text/html; charset=utf-8", self.html.encode("utf-8")
+
+    ############################################################################
+    def _render_ical(self, year):
+        group = "{}".format(year)
+
+        self.year = year
+        ical_events = self._publish(group, self._create_ical_events())
+        body = "".join(self._ical_chunks(ical_events))
+
+        # later changes are numbered relative to what was served
+        self.snapshot[group] = self.new_snapshot[group]
+
+        return "text/calendar; charset=utf-8", body.encode("utf-8")
+
+    ############################################################################
+    def _render_upcoming(self, start, end):
+        upcoming = []
+        for date, entry in self.upcoming(start, end):
+            upcoming.append(
+                {
+                    "date": date.isoformat(),
+                    "section": entry.section,
+                    "name": entry.name,
+                    "label": entry.label(date.year),
+                    "symbol": entry.style.symbol,
+                    "color": entry.style.color,
+                    "bgcolor": entry.style.bgcolor,
+                }
+            )
+
+        body = json.dumps(upcoming, ensure_ascii=False, indent=1)
+
+        return "application/json; charset=utf-8", body.encode("utf-8")
+
+    ############################################################################
+    def _watched_state(self):
+        """mtime and size of the config files and the template."""
+
+        watched_files = [
+            os.path.join(self.config_dir, "{}.cfg".format(interval))
+            for interval in self.intervals
+        ]
+        watched_files += self._source_files()
+        watched_files.append(os.path.join(self.template_dir, "html", "month.tpl.htm"))
+
+        state = []
+        for watched_file in watched_files:
+            try:
+                stat = os.stat(watched_file)
+            except FileNotFoundError:
+                state.append((watched_file, None, None))
+                continue
+            state.append((watched_file, stat.st_mtime_ns, stat.st_size))
+
+        return tuple(state)
+
+    ############################################################################
+    def _reload_if_changed(self):
+        """Re-reads config and template if they changed (at most once per
+        check_interval) and drops the rendered responses then."""
+
+        now = time.monotonic()
+        if now - self.checked < self.check_interval:
+            return
+        self.checked = now
+
+        watched = self._watched_state()
+        if watched == self.watched:
+            return
+
+        # keep serving what was rendered: the next check tries again
+        if not self._reload_entries_or_keep():
+            return
+        self._read_template()
+        self.watched = watched
+        self.responses.clear()
+
+        print("Reloaded config and template", file=sys.stderr)
+
+
+################################################################################
+################################################################################
+class ServeRequestHandler:
+    """Answers GET and HEAD requests with the responses of a ServeProcessor.
+
+    Combined with http.server.BaseHTTPRequestHandler by ServeProcessor.run()
+    – http.server is imported by the serve mode only.
+    """
+
+    ############################################################################
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    ############################################################################
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    ############################################################################
+    def _respond(self, send_body):
+        import urllib.parse
+
+        url = urllib.parse.urlsplit(self.path)
+
+        try:
+            response = self.server.processor.response(url.path, url.query)
+        except ValueError as ex:
+            self.send_error(400, "{}".format(ex))
+            return
+
+        if response is None:
+            self.send_error(404)
+            return
+
+        etag, content_type, body = response
+
+        if self._matches(etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", "{}".format(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+
+        if send_body:
+            self.wfile.write(body)
+
+    ############################################################################
+    def _matches(self, etag):
+        """True if the client already has this version (If-None-Match)."""
+
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is None:
+            return False
+
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") == etag:
+                return True
+
+        return False
+
+
+################################################################################
+################################################################################
+class WatchProcessor(BaseProcessor):
+    """This re-creates the HTML, ICAL and PDF output whenever the config or the
+    templates change – within one long-running process."""
+
+    # seconds between two checks for changed files
+    poll_interval = 1.0
+
+    ############################################################################
+    def __init__(self, debounce=2.0, processor_options=None, **kwargs):
+        """debounce is the time (in seconds) the files have to stay unchanged
+        before the output is re-created – edits come in bursts.
+
+        processor_options are passed on to the processors, e.g. jobs for the
+        PdfProcessor or alarms for the IcalProcessor.
+        """
+
+        self.debounce = debounce
+        self.processor_options = processor_options or dict()
+
+        super().__init__(**kwargs)
+
+    ############################################################################
+    def run(self):
+        config_state, template_state = self._watched_state()
+        self._run_processors(self.years)
+
+        print()
+        print("Watching {} and {}".format(self.config_dir, self.template_dir))
+
+        try:
+            while True:
+                time.sleep(self.poll_interval)
+                state = self._watched_state()
+                if state == (config_state, template_state):
+                    continue
+
+                # wait for the end of the burst
+                while True:
+                    time.sleep(self.debounce)
+                    settled = self._watched_state()
+                    if settled == state:
+                        break
+                    state = settled
+
+                years = []
+                if state[0] != config_state:
+                    years = self._reload_entries()
+                if state[1] != template_state:
+                    # the template is part of every month
+                    years = self.years
+
+                config_state, template_state = state
+                if years:
+                    self._run_processors(years)
+        except KeyboardInterrupt:
+            pass
+
+    ############################################################################
+    def _watched_state(self):
+        """mtime and size of the config and source files and of all template
+        files."""
+
+        import glob
+
+        config_files = glob.glob(os.path.join(self.config_dir, "*.cfg"))
+        config_files += self._source_files()
+        template_files = glob.glob(
+            os.path.join(self.template_dir, "**"), recursive=True
+        )
+
+        state = []
+        for watched_files in (config_files, template_files):
+            files_state = []
+            for watched_file in sorted(watched_files):
+                try:
+                    stat = os.stat(watched_file)
+                except FileNotFoundError:
+                    continue
+                files_state.append((watched_file, stat.st_mtime_ns, stat.st_size))
+            state.append(tuple(files_state))
+
+        return tuple(state)
+
+    ############################################################################
+    def _reload_entries(self):
+        """Re-reads the config; returns the years (of self.years) touched by the
+        changed anniversaries."""
+
+        old_entries = self.entries
+        if not self._reload_entries_or_keep():
+            # keep watching: the next change may fix it
+            return []
+
+        changed = set(map(self._entry_key, old_entries)) ^ set(
+            map(self._entry_key, self.entries)
+        )
+
+        touched = set()
+        for section, name, style, year, month, day in changed:
+            for cur_year in self.years:
+                if year is not None and year > cur_year:
+                    continue
+                if month is None:
+                    touched.update((cur_year, cur_month) for cur_month in range(1, 13))
+                else:
+                    touched.add((cur_year, month))
+
+        if touched:
+            print()
+            print(
+                "Changed: {}".format(
+                    ", ".join(
+                        "{}-{:02d}".format(year, month)
+                        for year, month in sorted(touched)
+                    )
+                )
+            )
+        else:
+            print()
+            print("Config changed, anniversaries did not")
+
+        # the HTML of unchanged months in these years is skipped by the manifest
+        return sorted(set(year for year, month in touched))
+
+    ############################################################################
+    @staticmethod
+    def _entry_key(entry):
+        style = (
+            entry.style.symbol,
+            entry.style.color,
+            entry.style.bgcolor,
+            entry.style.remind,
+        )
+        return (entry.section, entry.name, style, entry.year, entry.month, entry.day)
+
+    ############################################################################
+    def _run_processors(self, years):
+        """Runs HTML, ICAL and PDF processors for the years with the entries
+        already in memory."""
+
+        options = {
+            "use_cache": self.use_cache,
+            "years": years,
+            "force": self.force,
+            "entries": self.entries,
+            "index": self.index,
+            "sources": self.sources,
+            "metrics": self.metrics,
+            "writer": self.writer,
+            "config_dir": self.config_dir,
+            "output_dir": self.output_dir,
+            "archive": self.archive,
+        }
+        jobs = self.processor_options.get("jobs", 1)
+        single_pass = self.processor_options.get("single_pass", False)
+
+        started = time.perf_counter()
+        try:
+            if not single_pass:
+                HtmlProcessor(**options).run()
+            IcalProcessor(
+                rrule=self.processor_options.get("rrule", False),
+                alarms=self.processor_options.get("alarms"),
+                **options,
+            ).run()
+            PdfProcessor(jobs=jobs, single_pass=single_pass, **options).run()
+        except Exception as ex:
+            # keep watching: the next change may fix it
+            print("Failed: {}".format(ex), file=sys.stderr)
+            return
+
+        print()
+        print(
+            "Updated {} in {:.2f}s".format(
+                ", ".join("{}".format(year) for year in years),
+                time.perf_counter() - started,
+            )
+        )
+
+
+################################################################################
+################################################################################
+class RemindProcessor(BaseProcessor):
+    """This sends reminders of the anniversaries as a daemon – to stdout, a log
+    file or a command.
+
+    The reminder offsets are set per config section ("remind = -P1W, PT9H",
+    see Style.remind), default are the ICAL alarms. The fire times up to the
+    end of the day are kept in a min-heap; the daemon sleeps until the first
+    one is due (or the day ends). After each wake-up – and right away on
+    SIGHUP – changes of the config are applied: the reminders of removed
+    anniversaries are dropped, the ones of added anniversaries pushed.
+    """
+
+    ############################################################################
+    def __init__(self, alarms=None, log_file=None, hook=None, **kwargs):
+        """alarms are the default reminder offsets (see IcalProcessor).
+
+        Reminders are appended to log_file and passed to the hook command (as
+        last argument, details in ANNIVERSARY_* environment variables); with
+        neither they are printed.
+        """
+
+        self.alarms = IcalProcessor.default_alarms if alarms is None else tuple(alarms)
+        self.log_file = log_file
+        self.hook = hook
+
+        super().__init__(**kwargs)
+
+    ############################################################################
+    def run(self):
+        import heapq
+        import signal
+        import threading
+
+        self.wakeup = threading.Event()
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, lambda signum, frame: self.wakeup.set())
+
+        self.signature = self._signature(self._source_files())
+        # entry key => anniversary; the reminders of other keys are dropped
+        self.live = {WatchProcessor._entry_key(entry): entry for entry in self.entries}
+
+        now = datetime.datetime.now()
+        self.heap = []
+        # (fire time, key, trigger) of the reminders in the heap
+        self.queued = set()
+        self.sequence = 0
+        self.horizon = now
+        self._extend(now)
+
+        print(
+            "Reminding of {} anniversaries, {} reminder(s) left today".format(
+                len(self.live), len(self.heap)
+            ),
+            file=sys.stderr,
+        )
+
+        try:
+            while True:
+                now = datetime.datetime.now()
+                while self.heap and self.heap[0][0] <= now:
+                    fire_time, _, key, date, trigger = heapq.heappop(self.heap)
+                    self.queued.discard((fire_time, key, trigger))
+                    if key in self.live:
+                        self._send(fire_time, date, trigger, self.live[key])
+
+                if now >= self.horizon:
+                    self._extend(now)
+                    continue
+
+                due = self.heap[0][0] if self.heap else self.horizon
+                if self.wakeup.wait((min(due, self.horizon) - now).total_seconds()):
+                    self.wakeup.clear()
+
+                self._reload_if_changed()
+        except KeyboardInterrupt:
+            print()
+            print("Stopped reminding")
+
+    ############################################################################
+    def _extend(self, now):
+        """Pushes the reminders from the current horizon to the end of the day."""
+
+        start = max(self.horizon, now)
+        self.horizon = datetime.datetime.combine(
+            start.date() + datetime.timedelta(1), datetime.time()
+        )
+        self._push(self._reminders(start, self.horizon, self.live.keys()))
+
+    ############################################################################
+    def _reminders(self, start, end, keys):
+        """Returns (fire time, key, date, trigger) of the reminders of the
+        anniversaries with the given keys firing from start to end."""
+
+        triggers = set(self.alarms)
+        for style in set(entry.style for entry in self.entries):
+            triggers.update(style.triggers(self.alarms))
+
+        reminders = []
+        for trigger in triggers:
+            offset = parse_duration(trigger)
+            first_day = (start - offset).date()
+            last_day = (end - offset).date()
+            for date, entry in self.occurrences(first_day, last_day):
+                if trigger not in entry.style.triggers(self.alarms):
+                    continue
+                fire_time = datetime.datetime.combine(date, datetime.time()) + offset
+                if not start <= fire_time < end:
+                    continue
+                key = WatchProcessor._entry_key(entry)
+                if key in keys:
+                    reminders.append((fire_time, key, date, trigger))
+
+        return reminders
+
+    ############################################################################
+    def _push(self, reminders):
+        import heapq
+
+        for fire_time, key, date, trigger in reminders:
+            # e.g. an anniversary removed and added again
+            if (fire_time, key, trigger) in self.queued:
+                continue
+            self.queued.add((fire_time, key, trigger))
+
+            # the sequence keeps the heap from comparing the keys
+            self.sequence += 1
+            heapq.heappush(self.heap, (fire_time, self.sequence, key, date, trigger))
+
+    ############################################################################
+    def _reload_if_changed(self):
+        """Applies changes of the config to the heap – only the reminders of
+        added anniversaries are computed, the ones of removed anniversaries
+        are skipped when they are due."""
+
+        try:
+            signature = self._signature(self._source_files())
+        except OSError:
+            # e.g. a file just being replaced – checked again on the next wake-up
+            return
+        if signature == self.signature:
+            return
+
+        # keep the heap as it is: the next wake-up (or SIGHUP) tries again
+        if not self._reload_entries_or_keep():
+            return
+        self.signature = signature
+
+        live = {WatchProcessor._entry_key(entry): entry for entry in self.entries}
+        added = live.keys() - self.live.keys()
+        removed = len(self.live.keys() - live.keys())
+        self.live = live
+
+        # the reminders of unchanged anniversaries are in the heap already
+        self._push(self._reminders(datetime.datetime.now(), self.horizon, added))
+
+        print(
+            "Config changed: {} anniversaries added, {} removed".format(
+                len(added), removed
+            ),
+            file=sys.stderr,
+        )
+
+    ############################################################################
+    def _send(self, fire_time, date, trigger, entry):
+        import subprocess
+
+        days = (date - fire_time.date()).days
+        if days == 0:
+            when = "today"
+        elif days > 0:
+            when = "in {} day(s)".format(days)
+        else:
+            when = "{} day(s) ago".format(-days)
+        message = "{} {} {} ({})".format(
+            date.isoformat(), entry.style.symbol, entry.label(date.year), when
+        )
+
+        if self.log_file is None and self.hook is None:
+            print(message, flush=True)
+
+        if self.log_file is not None:
+            try:
+                with open(self.log_file, "a", encoding="utf-8") as fh:
+                    fh.write(
+                        "{} {}\n".format(fire_time.isoformat(" ", "minutes"), message)
+                    )
+            except OSError as ex:
+                print("Cannot log reminder: {}".format(ex), file=sys.stderr)
+
+        if self.hook is not None:
+            import shlex
+
+            env = dict(
+                os.environ,
+                ANNIVERSARY_DATE=date.isoformat(),
+                ANNIVERSARY_SECTION=entry.section,
+                ANNIVERSARY_NAME=entry.name,
+                ANNIVERSARY_LABEL=entry.label(date.year),
+                ANNIVERSARY_TRIGGER=trigger,
+            )
+            try:
+                subprocess.run(shlex.split(self.hook) + [message], env=env, timeout=60)
+            except (OSError, subprocess.SubprocessError) as ex:
+                print("Reminder hook failed: {}".format(ex), file=sys.stderr)
+
+
+################################################################################
+################################################################################
+class AllProcessor(BaseProcessor):
+    """This creates the output of several modes in one run: the config is read
+    and prepared once and the same anniversaries are handed to every processor.
+
+    The PDF files are rendered by --jobs worker processes (a thread for one
+    job) while the other modes run; each month is rendered as soon as its HTML
+    file is written. ICAL and the shell overview are created in threads while
+    the HTML is created.
+    """
+
+    shell_processors = {"bash": BashProcessor, "powershell": PowershellProcessor}
+
+    ############################################################################
+    def __init__(self, modes=("html", "ical", "pdf"), processor_options=None, **kwargs):
+        """modes are the modes to run: html, ical, pdf, bash and powershell.
+
+        processor_options are the options of their processors: jobs,
+        single_pass, rrule, alarms, delta, start and end.
+        """
+
+        self.modes = modes
+        self.processor_options = processor_options or dict()
+
+        super().__init__(**kwargs)
+
+    ############################################################################
+    def run(self):
+        self.errors = []
+
+        options = self.processor_options
+        single_pass = options.get("single_pass", False)
+
+        pdf = None
+        pipeline = contextlib.nullcontext(dict())
+        if "pdf" in self.modes:
+            pdf = self._processor(
+                PdfProcessor, jobs=options.get("jobs", 1), single_pass=single_pass
+            )
+            pipeline = pdf.pipeline(streamed=True)
+
+        ical = None
+        if "ical" in self.modes:
+            ical = self._processor(
+                IcalProcessor,
+                rrule=options.get("rrule", False),
+                alarms=options.get("alarms"),
+                delta=options.get("delta", False),
+                # an own writer: flush() reports the failures of its files only
+                writer=FileWriter(),
+            )
+
+        shells = [
+            self._processor(
+                self.shell_processors[mode],
+                start=options.get("start"),
+                end=options.get("end"),
+            )
+            for mode in self.modes
+            if mode in self.shell_processors
+        ]
+
+        with contextlib.ExitStack() as stack:
+            html_queues = stack.enter_context(pipeline)
+
+            tasks = []
+            if ical is not None or shells:
+                import concurrent.futures
+
+                executor = stack.enter_context(
+                    concurrent.futures.ThreadPoolExecutor(2, thread_name_prefix="all")
+                )
+                if ical is not None:
+                    tasks.append(executor.submit(ical.run))
+                if shells:
+                    # one after the other: their output keeps its order
+                    tasks.append(executor.submit(self._run_shells, shells))
+
+            def ready(year, html_file, html):
+                if year in html_queues:
+                    html_queues[year].put(pdf.html_source(html_file, html))
+
+            # the PDF is made from the HTML files (as in the pdf mode)
+            if "html" in self.modes or (pdf is not None and not single_pass):
+                html = self._processor(HtmlProcessor)
+                html.run(ready=ready)
+                self.errors += html.errors
+
+            for task in tasks:
+                task.result()
+            if ical is not None:
+                self.errors += ical.errors
+
+        if pdf is not None:
+            self.errors += pdf.errors
+
+    ############################################################################
+    @staticmethod
+    def _run_shells(shells):
+        for shell in shells:
+            shell.run()
+
+    ############################################################################
+    def _processor(self, cls, **options):
+        """A processor of the given class sharing the anniversaries of this one."""
+
+        options.setdefault("writer", self.writer)
+
+        return cls(
+            use_cache=self.use_cache,
+            rebuild_cache=self.rebuild_cache,
+            years=self.years,
+            force=self.force,
+            entries=self.entries,
+            index=self.index,
+            sources=self.sources,
+            metrics=self.metrics,
+            config_dir=self.config_dir,
+            output_dir=self.output_dir,
+            archive=self.archive,
+            **options,
+        )
+
+
+################################################################################
+################################################################################
+class BatchProcessor:
+    """This creates the output of many profiles (config dir + output dir) in one
+    invocation – it does not read a config itself.
+
+    The profiles are processed by a pool of worker processes; each worker
+    keeps templates, calendar grids and the PDF fonts loaded for all the
+    profiles it processes.
+    """
+
+    ############################################################################
+    def __init__(self, profiles, modes=("html", "ical", "pdf"), jobs=1, **kwargs):
+        """profiles is a list of (config dir, output dir); modes are the modes to
+        run per profile; kwargs are passed on to the processors.
+        """
+
+        self.profiles = profiles
+        self.modes = modes
+        self.jobs = jobs
+        self.metrics = kwargs.pop("metrics", None) or Metrics()
+        self.options = kwargs
+
+    ############################################################################
+    def run(self):
+        self.errors = []
+
+        executor = make_executor(min(self.jobs, len(self.profiles)))
+
+        started = time.perf_counter()
+        summaries = []
+        with executor:
+            futures = [
+                executor.submit(
+                    run_profile, config_dir, output_dir, self.modes, self.options
+                )
+                for config_dir, output_dir in self.profiles
+            ]
+
+            # reported in order to keep the output stable
+            for (config_dir, output_dir), future in zip(self.profiles, futures):
+                try:
+                    summary = future.result()
+                except Exception as ex:
+                    summary = {
+                        "config_dir": config_dir,
+                        "entries": 0,
+                        "wall": 0.0,
+                        "cpu": 0.0,
+                        "seconds": dict(),
+                        "errors": ["{}".format(ex)],
+                        "log": "",
+                        "totals": dict(),
+                    }
+
+                print()
+                print("#### {} => {}".format(config_dir, output_dir))
+                print(summary["log"], end="")
+
+                self.errors += [
+                    "{}: {}".format(config_dir, error) for error in summary["errors"]
+                ]
+                self.metrics.add(
+                    "profile",
+                    summary["wall"],
+                    summary["cpu"],
+                    entries=summary["entries"],
+                    bytes=sum(total["bytes"] for total in summary["totals"].values()),
+                    profile=config_dir,
+                )
+                summaries.append(summary)
+
+        self._print_summary(summaries, time.perf_counter() - started)
+
+    ############################################################################
+    def _print_summary(self, summaries, seconds):
+        print()
+        print("{} profile(s) in {:.2f}s:".format(len(summaries), seconds))
+        for summary in summaries:
+            stages = ", ".join(
+                "{} {:.2f}s".format(mode, seconds)
+                for mode, seconds in summary["seconds"].items()
+            )
+            print(
+                "   {:<6} {} ({} anniversaries, {:.2f}s{})".format(
+                    "FAILED" if summary["errors"] else "OK",
+                    summary["config_dir"],
+                    summary["entries"],
+                    summary["wall"],
+                    "; " + stages if stages else "",
+                )
+            )
+
+        if self.errors:
+            print()
+            print("{} error(s):".format(len(self.errors)))
+            for error in self.errors:
+                print("   {}".format(error))
+
+
+################################################################################
+################################################################################
+class SerialExecutor:
+    """Executor running each task right away in this process (for --jobs 1).
+
+    Offers what is used of concurrent.futures.Executor (submit, with) without
+    importing it before a task is submitted.
+    """
+
+    ############################################################################
+    def __enter__(self):
+        return self
+
+    ############################################################################
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    ############################################################################
+    def submit(self, fn, /, *args, **kwargs):
+        import concurrent.futures
+
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as ex:
+            future.set_exception(ex)
+
+        return future
+
+
+################################################################################
+################################################################################
+# Define CSS for page size, orientation, and margins
+# WeasyPrint uses CSS @page rules for layout
+PDF_PAGE_CSS = """
+@page {
+    size: A4 landscape;
+    margin: 1cm;
+}
+section.month + section.month {
+    page-break-before: always;
+}
+"""
+
+# parsed stylesheets and font configuration – shared by all renders of a process
+pdf_resources = None
+
+# the FileWriter of all processors of a process without an own one
+file_writer = None
+
+
+################################################################################
+def make_executor(workers):
+    """A process pool for more than one worker, a SerialExecutor otherwise."""
+
+    if workers > 1:
+        import concurrent.futures
+
+        return concurrent.futures.ProcessPoolExecutor(workers)
+
+    return SerialExecutor()
+
+
+################################################################################
+def get_file_writer():
+    """Returns the FileWriter shared by the processors – created once per process."""
+
+    global file_writer
+
+    if file_writer is None:
+        file_writer = FileWriter()
+
+    return file_writer
+
+
+################################################################################
+def make_index(entries, engine="auto"):
+    """The index of the given anniversaries: DateIndex for the engine "python",
+    ColumnarIndex for "numpy".
+
+    "auto" takes ColumnarIndex from columnar_size anniversaries on, if NumPy
+    is installed. Without NumPy it is DateIndex in any case.
+    """
+
+    if engine == "python" or (engine == "auto" and len(entries) < columnar_size):
+        return DateIndex(entries)
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        if engine == "numpy":
+            print("NumPy is not installed: using the python engine", file=sys.stderr)
+        return DateIndex(entries)
+
+    return ColumnarIndex(entries)
+
+
+# from this number of anniversaries on the numpy engine pays off (see
+# make_index()) – below, importing NumPy takes longer than it saves
+columnar_size = 100000
+
+
+################################################################################
+################################################################################
+def get_pdf_resources():
+    """Returns (font_config, stylesheets) – created once per process."""
+
+    global pdf_resources
+
+    if pdf_resources is None:
+        import weasyprint
+        from weasyprint.text.fonts import FontConfiguration
+
+        font_config = FontConfiguration()
+        stylesheets = [weasyprint.CSS(string=PDF_PAGE_CSS, font_config=font_config)]
+        pdf_resources = (font_config, stylesheets)
+
+    return pdf_resources
+
+
+################################################################################
+def render_pdf(html_source):
+    """Lays out one HTML source (the arguments of weasyprint.HTML()) – returns
+    the WeasyPrint document.
+    """
+
+    import weasyprint
+
+    font_config, stylesheets = get_pdf_resources()
+
+    return weasyprint.HTML(**html_source).render(
+        stylesheets=stylesheets,  # Apply custom CSS
+        font_config=font_config,
+        presentational_hints=True,  # Optional: better HTML-to-PDF rendering
+    )
+
+
+################################################################################
+def make_year_pdf(html_sources, pdf_files, year_file):
+    """Renders the months of a year to PDF – one file per month and one per year.
+
+    html_sources are the arguments of weasyprint.HTML() per month: filename
+    of the HTML file or string and base_url (see PdfProcessor.html_source()).
+
+    Every month is laid out only once: the year file re-uses the rendered
+    pages, rotated east for printing. Nothing is written: the caller writes
+    the returned PDFs (see FileWriter). Module level to be usable in worker
+    processes.
+
+    Returns the list of errors (one per failed month), the seconds spent on
+    assembling the year file, the timings: (stage, file, wall, CPU) for each
+    month and the year and the created files as (file, PDF).
+    """
+
+    documents = []
+    errors = []
+    timings = []
+    files = []
+    for html_source, pdf_file in zip(html_sources, pdf_files):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            document = render_pdf(html_source)
+            files.append((pdf_file, document.write_pdf()))
+        except Exception as ex:
+            errors.append("{}: {}".format(pdf_file, ex))
+            continue
+        documents.append(document)
+        timings.append(
+            (
+                "pdf",
+                pdf_file,
+                time.perf_counter() - wall,
+                time.process_time() - cpu,
+            )
+        )
+
+    if len(documents) + len(errors) < len(pdf_files):
+        errors.append("{}: not all months were rendered".format(year_file))
+
+    if errors:
+        return errors, None, timings, []
+
+    start, cpu = time.perf_counter(), time.process_time()
+
+    pages = [page for document in documents for page in document.pages]
+    files.append((year_file, make_year_pdf_data(documents[0], pages)))
+
+    seconds = time.perf_counter() - start
+    timings.append(("pdf_year", year_file, seconds, time.process_time() - cpu))
+
+    return errors, seconds, timings, files
+
+
+################################################################################
+def make_year_pdf_from_queue(html_queue, pdf_files, year_file):
+    """make_year_pdf for HTML still being created: the HTML sources are taken
+    from html_queue as soon as they are put there, None ends the queue.
+    """
+
+    return make_year_pdf(iter(html_queue.get, None), pdf_files, year_file)
+
+
+################################################################################
+def make_year_pdf_single_pass(year_html, base_url, pdf_files, year_file):
+    """Renders the HTML of a whole year (see HtmlProcessor._create_year_html) once.
+
+    The monthly PDFs are cut from the rendered document: a month runs from
+    the page holding its section anchor to the page before the next one.
+    Returns the same as make_year_pdf; the rendering of the year is the stage
+    pdf_render.
+    """
+
+    timings = []
+    wall, cpu = time.perf_counter(), time.process_time()
+
+    document = render_pdf({"string": year_html, "base_url": base_url})
+
+    first_pages = dict()
+    for number, page in enumerate(document.pages):
+        for anchor in page.anchors:
+            if anchor.startswith("month-"):
+                first_pages.setdefault(int(anchor[6:]), number)
+    first_pages[13] = len(document.pages)
+
+    timings.append(
+        ("pdf_render", year_file, time.perf_counter() - wall, time.process_time() - cpu)
+    )
+
+    errors = []
+    files = []
+    for month, pdf_file in enumerate(pdf_files, 1):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            pages = document.pages[first_pages[month] : first_pages[month + 1]]
+            files.append((pdf_file, document.copy(pages).write_pdf()))
+        except Exception as ex:
+            errors.append("{}: {}".format(pdf_file, ex))
+            continue
+        timings.append(
+            (
+                "pdf",
+                pdf_file,
+                time.perf_counter() - wall,
+                time.process_time() - cpu,
+            )
+        )
+
+    if errors:
+        return errors, None, timings, []
+
+    start, cpu = time.perf_counter(), time.process_time()
+
+    files.append((year_file, make_year_pdf_data(document, document.pages)))
+
+    seconds = time.perf_counter() - start
+    timings.append(("pdf_year", year_file, seconds, time.process_time() - cpu))
+
+    return errors, seconds, timings, files
+
+
+################################################################################
+def make_year_pdf_data(document, pages):
+    """The given pages rotated east as PDF (bytes)."""
+
+    return document.copy(pages).write_pdf(finisher=rotate_pages_east)
+
+
+################################################################################
+def rotate_pages_east(document, pdf):
+    """WeasyPrint finisher rotating all pages by 90° clockwise."""
+
+    for page_number in pdf.pages["Kids"][::3]:
+        pdf.objects[page_number]["Rotate"] = 90
+
+
+################################################################################
+def convert_to_ps(pdf_data):
+    """Converts one PDF to PS – module level to be usable in worker processes.
+
+    The PDF is piped through pdf2ps; nothing is written. Returns the wall and
+    CPU seconds of the pdf2ps call and the PS.
+    """
+
+    import subprocess
+
+    pdf2ps = "/usr/bin/pdf2ps"
+
+    start, times = time.perf_counter(), os.times()
+    # "-" is stdin / stdout for pdf2ps (ghostscript)
+    result = subprocess.run([pdf2ps, "-", "-"], input=pdf_data, stdout=subprocess.PIPE)
+    errorcode, ps_data = result.returncode, result.stdout
+    if errorcode > 0:
+        raise RuntimeError("Error {} calling {}".format(errorcode, pdf2ps))
+
+    after = os.times()
+    cpu = after.children_user + after.children_system
+    cpu -= times.children_user + times.children_system
+
+    return time.perf_counter() - start, cpu, ps_data
+
+
+################################################################################
+################################################################################
+def run_profile(config_dir, output_dir, modes, options):
+    """Runs the given modes for one profile – module level to be usable in
+    worker processes.
+
+    The config is read once for all modes. Returns a summary dict with the
+    output (log), errors, seconds per mode and the totals of the stages.
+    """
+
+    processors = {
+        "html": (HtmlProcessor, dict()),
+        "ical": (
+            IcalProcessor,
+            {
+                "rrule": options.get("rrule", False),
+                "alarms": options.get("alarms"),
+                "delta": options.get("delta", False),
+            },
+        ),
+        "pdf": (PdfProcessor, {"single_pass": options.get("single_pass", False)}),
+    }
+    options = {
+        key: value
+        for key, value in options.items()
+        if key not in ("rrule", "alarms", "delta", "single_pass")
+    }
+
+    # the PDF is made from the HTML files (as in the pdf mode)
+    if "pdf" in modes and "html" not in modes:
+        if not processors["pdf"][1]["single_pass"]:
+            modes = ["html"] + list(modes)
+
+    metrics = Metrics()
+    errors = []
+    log = io.StringIO()
+    started, cpu = time.perf_counter(), time.process_time()
+
+    if not os.path.isdir(config_dir):
+        modes = []
+        errors.append("no such config dir")
+
+    entries = None
+    index = None
+    seconds = dict()
+    with contextlib.redirect_stdout(log):
+        for mode in modes:
+            cls, mode_options = processors[mode]
+            mode_started = time.perf_counter()
+            try:
+                processor = cls(
+                    config_dir=config_dir,
+                    output_dir=output_dir,
+                    entries=entries,
+                    index=index,
+                    metrics=metrics,
+                    **options,
+                    **mode_options,
+                )
+                entries, index = processor.entries, processor.index
+                processor.run()
+                errors += getattr(processor, "errors", [])
+            except Exception as ex:
+                errors.append("{}: {}".format(mode, ex))
+            seconds[mode] = time.perf_counter() - mode_started
+
+    return {
+        "config_dir": config_dir,
+        "entries": len(entries or []),
+        "wall": time.perf_counter() - started,
+        "cpu": time.process_time() - cpu,
+        "seconds": seconds,
+        "errors": errors,
+        "log": log.getvalue(),
+        "totals": metrics.totals(),
+    }
+
+
+################################################################################
+################################################################################
+def read_profiles(profiles_file):
+    """Reads the profiles of a batch: one "CONFIG_DIR [OUTPUT_DIR]" per line.
+
+    Relative paths are relative to the profiles file; OUTPUT_DIR defaults to
+    output/ next to CONFIG_DIR. Empty lines and lines starting with # are
+    skipped.
+    """
+
+    base_dir = os.path.dirname(os.path.abspath(profiles_file))
+
+    profiles = []
+    with open(profiles_file, "r") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            parts = line.split(None, 1)
+            config_dir = os.path.join(base_dir, parts[0])
+            if len(parts) > 1:
+                output_dir = os.path.join(base_dir, parts[1].strip())
+            else:
+                output_dir = os.path.join(os.path.dirname(config_dir), "output")
+            profiles.append(
+                (os.path.normpath(config_dir), os.path.normpath(output_dir))
+            )
+
+    return profiles
+
+
+################################################################################
+################################################################################
+def days_in_month(year, month):
+    """Like calendar.monthrange(year, month)[1]."""
+
+    if month == 12:
+        return 31
+
+    return (datetime.date(year, month + 1, 1) - datetime.timedelta(1)).day
+
+
+################################################################################
+################################################################################
+year_regex = re.compile("[12][0-9]{3}")
+
+
+def parse_date(value, interval="yearly"):
+    """Parses a config date ("YYYY-MM-DD", "????-MM-DD", "xxxx-MM-DD" or "DD"
+    for monthly anniversaries) into (year, month, day) – year/month may be None.
+
+    Raises ValueError for invalid dates.
+    """
+
+    day = int(value[-2:])
+    if interval == "monthly":
+        month = None
+    else:
+        month = int(value[-5:-3])
+        if not 1 <= month <= 12:
+            raise ValueError("invalid month: {}".format(value))
+    if not 1 <= day <= 31:
+        raise ValueError("invalid day: {}".format(value))
+    if month is not None:
+        # checked against a leap year: 02-29 is shown in leap years only
+        try:
+            datetime.date(2000, month, day)
+        except ValueError:
+            raise ValueError("invalid day: {}".format(value))
+
+    if year_regex.match(value[:4]):
+        year = int(value[:4])
+    else:
+        year = None
+
+    return year, month, day
+
+
+################################################################################
+################################################################################
+def read_source(source_file):
+    """Reads the anniversaries of a .cfg, .csv or .vcf file.
+
+    Returns (records, section styles, errors, size, seconds, CPU seconds);
+    records are tuples (section, name, style, year, month, day) with style
+    being (symbol, color, bgcolor) or None to use the style of the section.
+    This runs in worker processes, so everything returned is plain data.
+    """
+
+    started, cpu = time.perf_counter(), time.process_time()
+
+    for extension, reader in source_readers.items():
+        if source_file.endswith(extension):
+            break
+    else:
+        raise ValueError("unknown type of source")
+
+    records = []
+    section_styles = dict()
+    errors = []
+    size = os.path.getsize(source_file)
+
+    for record in reader(source_file, section_styles, errors):
+        records.append(record)
+
+    seconds = time.perf_counter() - started
+    return records, section_styles, errors, size, seconds, time.process_time() - cpu
+
+
+################################################################################
+################################################################################
+def read_cfg_records(source_file, section_styles, errors):
+    """Yields the records of a config file – files named monthly*.cfg hold
+    monthly anniversaries, all others yearly ones."""
+
+    interval = "yearly"
+    if os.path.basename(source_file).startswith("monthly"):
+        interval = "monthly"
+
+    config = configparser.RawConfigParser()
+    config.optionxform = str
+    with open(source_file, "r", encoding="utf-8") as fh:
+        config.read_file(fh)
+
+    for section in config.sections():
+        remind = config.get(section, "remind", fallback=None)
+        if remind is not None:
+            try:
+                remind = parse_durations(remind)
+            except ValueError as ex:
+                errors.append("{}/remind: {} ({})".format(section, ex, source_file))
+                remind = None
+
+        style = (
+            config.get(section, "symbol", fallback="?"),
+            config.get(section, "color", fallback="#000000"),
+            config.get(section, "bgcolor", fallback="#ffffff"),
+            remind,
+        )
+        section_styles.setdefault(section, style)
+
+        for option in config.options(section):
+            if option in ["symbol", "color", "bgcolor", "remind"]:
+                continue
+
+            value = config.get(section, option)
+            try:
+                year, month, day = parse_date(value, interval)
+            except ValueError:
+                errors.append(
+                    "{}/{}: invalid date {} ({})".format(
+                        section, option, value, source_file
+                    )
+                )
+                continue
+
+            yield section, option, style, year, month, day
+
+
+################################################################################
+################################################################################
+def read_csv_records(source_file, section_styles, errors):
+    """Yields the records of a CSV file (separated by comma, semicolon or tab).
+
+    The first line names the columns: name and date are required; section
+    (default: the file name), interval (yearly/monthly), symbol, color,
+    bgcolor and remind are optional.
+    """
+
+    import csv
+
+    default_section = os.path.splitext(os.path.basename(source_file))[0]
+
+    with open(source_file, "r", encoding="utf-8-sig", newline="") as fh:
+        try:
+            dialect = csv.Sniffer().sniff(fh.read(64 * 1024), delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        fh.seek(0)
+
+        reader = csv.reader(fh, dialect)
+        header = [column.strip().lower() for column in next(reader, [])]
+        if "name" not in header or "date" not in header:
+            raise ValueError("the columns name and date are required")
+        width = len(header)
+        # position of each column, missing ones point to an empty last column
+        columns = {column: position for position, column in enumerate(header)}
+        name_pos, date_pos = columns["name"], columns["date"]
+        section_pos, interval_pos, symbol_pos, color_pos, bgcolor_pos, remind_pos = (
+            columns.get(column, width)
+            for column in (
+                "section",
+                "interval",
+                "symbol",
+                "color",
+                "bgcolor",
+                "remind",
+            )
+        )
+        padding = [""] * (width + 1)
+
+        for row in reader:
+            if not row:
+                continue
+            row += padding[len(row) :]
+
+            section = row[section_pos].strip() or default_section
+            name = row[name_pos].strip()
+            value = row[date_pos].strip()
+            interval = row[interval_pos].strip().lower() or "yearly"
+
+            try:
+                style = None
+                if row[symbol_pos].strip():
+                    remind = None
+                    if row[remind_pos].strip():
+                        remind = parse_durations(row[remind_pos])
+                    style = (
+                        row[symbol_pos].strip(),
+                        row[color_pos].strip() or "#000000",
+                        row[bgcolor_pos].strip() or "#ffffff",
+                        remind,
+                    )
+
+                if not name or interval not in ("monthly", "yearly"):
+                    raise ValueError()
+                year, month, day = parse_date(value, interval)
+            except ValueError:
+                errors.append(
+                    "{}/{}: invalid entry in line {} of {}".format(
+                        section, name, reader.line_num, source_file
+                    )
+                )
+                continue
+
+            yield section, name, style, year, month, day
+
+
+################################################################################
+################################################################################
+def read_vcard_records(source_file, section_styles, errors):
+    """Yields BDAY (section birthdays) and ANNIVERSARY (section weddings) of the
+    cards in a vCard file; the name is "Last, First" (from N) or FN."""
+
+    sections = {
+        "BDAY": "birthdays",
+        "ANNIVERSARY": "weddings",
+        "X-ANNIVERSARY": "weddings",
+    }
+
+    def unescape(value):
+        return re.sub(r"\\(.)", lambda match: match.group(1).replace("n", " "), value)
+
+    def card_lines(fh):
+        """Unfolds the lines (continuation lines start with a blank)."""
+
+        line = None
+        for raw_line in fh:
+            raw_line = raw_line.rstrip("\r\n")
+            if raw_line[:1] in (" ", "\t") and line is not None:
+                line += raw_line[1:]
+                continue
+            if line is not None:
+                yield line
+            line = raw_line
+        if line is not None:
+            yield line
+
+    with open(source_file, "r", encoding="utf-8", errors="replace") as fh:
+        full_name = name = None
+        dates = []
+        for line in card_lines(fh):
+            prop, _, value = line.partition(":")
+            # drop parameters and group (e.g. item1.BDAY;VALUE=date)
+            prop = prop.split(";")[0].rsplit(".", 1)[-1].upper()
+
+            if prop == "BEGIN":
+                full_name = name = None
+                dates = []
+            elif prop == "FN":
+                full_name = unescape(value).strip()
+            elif prop == "N":
+                parts = [unescape(part).strip() for part in value.split(";")]
+                if len(parts) > 1 and parts[0] and parts[1]:
+                    name = "{}, {}".format(parts[0], parts[1])
+            elif prop in sections:
+                dates.append((sections[prop], value.strip()))
+            elif prop == "END":
+                card_name = name or full_name
+                for section, value in dates:
+                    try:
+                        if not card_name:
+                            raise ValueError()
+                        year, month, day = parse_date(vcard_date(value))
+                    except ValueError:
+                        errors.append(
+                            "{}/{}: invalid date {} ({})".format(
+                                section, card_name, value, source_file
+                            )
+                        )
+                        continue
+
+                    yield section, card_name, None, year, month, day
+
+
+################################################################################
+################################################################################
+def vcard_date(value):
+    """Converts a vCard date (19901020, 1990-10-20, --1020, --10-20, also with
+    time) into the config format (1990-10-20, ????-10-20)."""
+
+    digits = value.split("T")[0].replace("-", "")
+    if not digits.isdigit():
+        raise ValueError("invalid date: {}".format(value))
+    if len(digits) == 8:
+        return "{}-{}-{}".format(digits[:4], digits[4:6], digits[6:])
+    if len(digits) == 4 and value.startswith("--"):
+        return "????-{}-{}".format(digits[:2], digits[2:])
+
+    raise ValueError("invalid date: {}".format(value))
+
+
+# file extension => function yielding the records of such a file
+source_readers = {
+    ".cfg": read_cfg_records,
+    ".csv": read_csv_records,
+    ".vcf": read_vcard_records,
+    ".vcard": read_vcard_records,
+}
+
+# from this total size of several source files on they are parsed in parallel
+parallel_import_size = 4 * 1024 * 1024
+
+
+################################################################################
+################################################################################
+def parse_alarms(value):
+    """Parses a comma separated list of ical durations like "-P1W,PT0S"."""
+
+    try:
+        return list(parse_durations(value))
+    except ValueError as ex:
+        raise argparse.ArgumentTypeError(ex)
+
+
+################################################################################
+def parse_durations(value):
+    """Returns the tuple of ical durations of a comma separated list; raises
+    ValueError for an invalid one."""
+
+    durations = tuple(
+        duration.strip() for duration in value.split(",") if duration.strip()
+    )
+    for duration in durations:
+        parse_duration(duration)
+
+    return durations
+
+
+################################################################################
+def parse_duration(value):
+    """Returns the timedelta of an ical duration like "-P1W" or "PT9H30M"."""
+
+    match = re.match(
+        "([+-]?)P(?:([0-9]+)W|(?:([0-9]+)D)?(?:T(?:([0-9]+)H)?(?:([0-9]+)M)?"
+        "(?:([0-9]+)S)?)?)$",
+        value,
+    )
+    if not match or value.endswith(("P", "T")):
+        raise ValueError("invalid duration: {}".format(value))
+
+    sign, weeks, days, hours, minutes, seconds = match.groups()
+    duration = datetime.timedelta(
+        weeks=int(weeks or 0),
+        days=int(days or 0),
+        hours=int(hours or 0),
+        minutes=int(minutes or 0),
+        seconds=int(seconds or 0),
+    )
+
+    return -duration if sign == "-" else duration
+
+
+################################################################################
+################################################################################
+def parse_years(value):
+    """Parses "2026" or "2020..2040" into a range of years."""
+
+    first, _, last = value.partition("..")
+    try:
+        first = int(first)
+        last = int(last) if last else first
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid years: {}".format(value))
+    # the years of datetime.date
+    if not 1 <= first <= last <= 9999:
+        raise argparse.ArgumentTypeError("invalid years: {}".format(value))
+
+    return range(first, last + 1)
 
 
 ################################################################################
@@ -574,47 +4221,329 @@ class IcalProcessor(BaseProcessor):
 if __name__ == "__main__":
 
     modes = {
+        "all": "run --modes with one read of the config, PDF in the background",
         "base": "reads the config",
+        "batch": "run several profiles (config and output dir) at once, see --batch",
         "bash": "output to bash",
         "html": "output to HTML files",
         "ical": "output to ICAL files (e.g. for import to thunderbird)",
         "pdf": "output to PDF files (from HTML)",
         "powershell": "output to powershell",
+        "remind": "send reminders (offsets per section: remind = -P1W, PT9H) until stopped",
+        "serve": "serve HTML, ICAL and upcoming anniversaries via HTTP on localhost",
+        "watch": "re-create HTML, ICAL and PDF output whenever the config changes",
     }
 
-    usage = [
-        "",
-        "Usage: {} [{}]".format(sys.argv[0], "|".join(sorted(modes.keys()))),
-        "",
-    ]
-
+    usage = ["modes:"]
     for mode in sorted(modes.items()):
         usage.append("   {}: {}".format(mode[0], mode[1]))
 
-    if len(sys.argv) != 2 or sys.argv[1] not in modes.keys():
-        for l in usage:
-            print(l)
-        sys.exit(1)
-
-    if sys.argv[1] == "base":
-        processor = BaseProcessor()
-        processor.run()
-    elif sys.argv[1] == "bash":
-        processor = BashProcessor()
-        processor.run()
-    elif sys.argv[1] == "powershell":
-        processor = PowershellProcessor()
-        processor.run()
-    elif sys.argv[1] == "html":
-        processor = HtmlProcessor()
-        processor.run()
-    elif sys.argv[1] == "pdf":
-        processor = HtmlProcessor()
-        processor.run()
-        processor = PdfProcessor()
-        processor.run()
-    elif sys.argv[1] == "ical":
-        processor = IcalProcessor()
-        processor.run()
+    parser = argparse.ArgumentParser(
+        epilog="\n".join(usage),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("mode", choices=sorted(modes.keys()), metavar="mode")
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="bypass the cache of parsed config entries",
+    )
+    parser.add_argument(
+        "--rebuild-cache",
+        action="store_true",
+        help="re-parse the config and rewrite the cache",
+    )
+    parser.add_argument(
+        "--source",
+        dest="sources",
+        action="append",
+        metavar="PATH",
+        help="import anniversaries from a directory or a .cfg/.csv/.vcf file "
+        "too (can be given several times)",
+    )
+    parser.add_argument(
+        "--from",
+        dest="start",
+        type=datetime.date.fromisoformat,
+        metavar="YYYY-MM-DD",
+        help="shell modes: first day to show (default: 7 days ago)",
+    )
+    parser.add_argument(
+        "--to",
+        dest="end",
+        type=datetime.date.fromisoformat,
+        metavar="YYYY-MM-DD",
+        help="shell modes: last day to show (default: in 30 days)",
+    )
+    parser.add_argument(
+        "--days",
+        type=int,
+        metavar="N",
+        help="shell modes: show N days from --from (default: from today) on",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="html/ical/pdf: recreate all files, even if their inputs did not change",
+    )
+    parser.add_argument(
+        "--years",
+        type=parse_years,
+        metavar="YYYY[..YYYY]",
+        help="html/ical/pdf: year or range of years (default: this and next year)",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        metavar="N",
+        help="pdf: number of processes rendering months in parallel; batch: "
+        "number of profiles processed in parallel (default: 1)",
+    )
+    parser.add_argument(
+        "--single-pass",
+        action="store_true",
+        help="pdf: render each year from memory in one pass (no HTML files needed)",
+    )
+    parser.add_argument(
+        "--archive",
+        metavar="FILE",
+        help="html/ical/pdf/all: write the files to one archive (.tar.gz, .zip "
+        "etc.) instead of output/; '-' writes a .tar.gz to stdout",
+    )
+    parser.add_argument(
+        "--ical-rrule",
+        action="store_true",
+        help="ical: write one recurring event per anniversary to one file",
+    )
+    parser.add_argument(
+        "--ical-delta",
+        action="store_true",
+        help="ical: only write the events added/changed/removed since the last run",
+    )
+    parser.add_argument(
+        "--alarms",
+        type=parse_alarms,
+        metavar="DURATION,...",
+        help="ical/remind: reminder triggers of sections without own 'remind', "
+        "e.g. -P1W,-P1D,PT0S ('' for none; default: -P1W,PT0S)",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8080,
+        metavar="N",
+        help="serve: port to listen on at localhost (default: 8080)",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        metavar="SECONDS",
+        help="watch: wait until the files did not change for SECONDS (default: 2)",
+    )
+    parser.add_argument(
+        "--remind-log",
+        metavar="FILE",
+        help="remind: append the reminders to FILE instead of printing them",
+    )
+    parser.add_argument(
+        "--remind-hook",
+        metavar="COMMAND",
+        help="remind: run COMMAND with the reminder as last argument (details in "
+        "ANNIVERSARY_* environment variables) instead of printing it",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="batch: the profiles, one 'CONFIG_DIR [OUTPUT_DIR]' per line",
+    )
+    parser.add_argument(
+        "--modes",
+        default="html,ical,pdf",
+        metavar="MODE,...",
+        help="all: the modes to run, html, ical, pdf, bash and powershell; batch: "
+        "the modes to run per profile, html, ical and pdf (default: html,ical,pdf)",
+    )
+    parser.add_argument(
+        "--engine",
+        choices=("auto", "python", "numpy"),
+        default="auto",
+        help="index of the anniversaries: numpy computes the occurrences in "
+        "batch, auto uses it for large configs if NumPy is installed (default: auto)",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="write a cProfile dump of the run to FILE (see python -m pstats)",
+    )
+    parser.add_argument(
+        "--metrics-json",
+        metavar="FILE",
+        help="write wall/CPU time, entries and bytes of each stage to FILE",
+    )
+    args = parser.parse_args()
+
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+
+    args.modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    for mode in args.modes:
+        if mode in AllProcessor.shell_processors and args.mode == "all":
+            continue
+        if mode not in ("html", "ical", "pdf"):
+            parser.error(
+                "--modes supports html, ical and pdf (all: bash and powershell too)"
+            )
+
+    if args.mode == "batch" and not args.batch:
+        parser.error("the batch mode needs --batch")
+
+    archive = None
+    if args.archive is not None:
+        if args.mode not in ("html", "ical", "pdf", "all"):
+            parser.error("--archive supports the modes html, ical, pdf and all")
+        try:
+            archive = Archive(args.archive)
+        except ValueError as ex:
+            parser.error("{}".format(ex))
+
+    if args.days is not None:
+        if args.end is not None:
+            parser.error("--days and --to are mutually exclusive")
+        try:
+            args.end = (args.start or datetime.date.today()) + datetime.timedelta(
+                args.days
+            )
+        except OverflowError:
+            parser.error("--days {} is out of the range of dates".format(args.days))
+
+    metrics = Metrics()
+
+    options = {
+        "use_cache": not args.no_cache,
+        "rebuild_cache": args.rebuild_cache,
+        "years": args.years,
+        "force": args.force,
+        "sources": args.sources,
+        "metrics": metrics,
+        "engine": args.engine,
+        "archive": archive,
+    }
+    shell_options = dict(options, start=args.start, end=args.end)
+
+    profiler = None
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    # the archive is completed (and replaces an existing one) only on success
+    with contextlib.ExitStack() as stack:
+        if archive is not None:
+            stack.enter_context(archive)
+            if args.archive == "-":
+                # stdout takes the archive – the reports go to stderr
+                stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+
+        try:
+            if args.mode == "base":
+                processor = BaseProcessor(**options)
+                processor.run()
+            elif args.mode == "bash":
+                processor = BashProcessor(**shell_options)
+                processor.run()
+            elif args.mode == "powershell":
+                processor = PowershellProcessor(**shell_options)
+                processor.run()
+            elif args.mode == "html":
+                processor = HtmlProcessor(**options)
+                processor.run()
+                if processor.errors:
+                    sys.exit(1)
+            elif args.mode == "pdf":
+                if not args.single_pass:
+                    processor = HtmlProcessor(**options)
+                    processor.run()
+                processor = PdfProcessor(
+                    jobs=args.jobs, single_pass=args.single_pass, **options
+                )
+                processor.run()
+                if processor.errors:
+                    sys.exit(1)
+            elif args.mode == "ical":
+                processor = IcalProcessor(
+                    rrule=args.ical_rrule,
+                    alarms=args.alarms,
+                    delta=args.ical_delta,
+                    **options,
+                )
+                processor.run()
+                if processor.errors:
+                    sys.exit(1)
+            elif args.mode == "remind":
+                processor = RemindProcessor(
+                    alarms=args.alarms,
+                    log_file=args.remind_log,
+                    hook=args.remind_hook,
+                    **options,
+                )
+                processor.run()
+            elif args.mode == "serve":
+                processor = ServeProcessor(
+                    port=args.port, alarms=args.alarms, **options
+                )
+                processor.run()
+            elif args.mode == "all":
+                processor = AllProcessor(
+                    modes=args.modes,
+                    processor_options={
+                        "jobs": args.jobs,
+                        "single_pass": args.single_pass,
+                        "rrule": args.ical_rrule,
+                        "alarms": args.alarms,
+                        "delta": args.ical_delta,
+                        "start": args.start,
+                        "end": args.end,
+                    },
+                    **options,
+                )
+                processor.run()
+                if processor.errors:
+                    sys.exit(1)
+            elif args.mode == "batch":
+                processor = BatchProcessor(
+                    read_profiles(args.batch),
+                    modes=args.modes,
+                    jobs=args.jobs,
+                    single_pass=args.single_pass,
+                    rrule=args.ical_rrule,
+                    alarms=args.alarms,
+                    delta=args.ical_delta,
+                    **options,
+                )
+                processor.run()
+                if processor.errors:
+                    sys.exit(1)
+            elif args.mode == "watch":
+                processor = WatchProcessor(
+                    debounce=args.debounce,
+                    processor_options={
+                        "jobs": args.jobs,
+                        "single_pass": args.single_pass,
+                        "rrule": args.ical_rrule,
+                        "alarms": args.alarms,
+                    },
+                    **options,
+                )
+                processor.run()
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                profiler.dump_stats(args.profile)
+                print("Profile written to {}".format(args.profile), file=sys.stderr)
+            if args.metrics_json:
+                metrics.save(args.metrics_json)
 
     # processor.test_output()
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""Starts anniversary-processor.py from its cached bytecode.
+
+Python compiles a script given on the command line on every start, which is
+about half of the start time of the shell modes. This loads the compiled code
+from __pycache__ (written by the first call) and runs it exactly as if
+anniversary-processor.py had been started – same arguments, same __main__.
+
+Usage: launcher.py [arguments of anniversary-processor.py]
+"""
+
+import importlib.machinery
+import os
+import sys
+
+script = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "anniversary-processor.py"
+)
+code = importlib.machinery.SourceFileLoader("__main__", script).get_code("__main__")
+
+sys.argv[0] = __file__ = script
+exec(code)
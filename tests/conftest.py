@@ -0,0 +1,53 @@
+"""Fixtures shared by the tests."""
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC_DIR = os.path.join(BASE_DIR, "src")
+
+
+################################################################################
+@pytest.fixture(scope="session")
+def ap():
+    """src/anniversary-processor.py as module (the name is not importable as is)."""
+
+    if SRC_DIR not in sys.path:
+        sys.path.insert(0, SRC_DIR)
+
+    spec = importlib.util.spec_from_file_location(
+        "anniversary_processor", os.path.join(SRC_DIR, "anniversary-processor.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+################################################################################
+@pytest.fixture
+def read_records(ap, tmp_path):
+    """Writes the given content to a file of the given name and reads it with
+    the reader of its type – returns (records, section styles, errors).
+    """
+
+    def read(filename, content):
+        source_file = tmp_path / filename
+        source_file.write_text(content, encoding="utf-8")
+
+        for extension, reader in ap.source_readers.items():
+            if filename.endswith(extension):
+                break
+        else:
+            raise ValueError("unknown type of source")
+
+        section_styles = dict()
+        errors = []
+        records = list(reader(str(source_file), section_styles, errors))
+
+        return records, section_styles, errors
+
+    return read
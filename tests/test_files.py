@@ -0,0 +1,74 @@
+"""Tests of writing files: AtomicFile, Manifest and FileWriter."""
+
+import os
+
+import pytest
+
+
+################################################################################
+def test_atomic_file(ap, tmp_path):
+    filename = tmp_path / "new" / "file.txt"
+
+    with ap.AtomicFile(str(filename), "w", encoding="utf-8") as fh:
+        fh.write("one")
+        # nothing visible before the with statement ends
+        assert not filename.exists()
+
+    assert filename.read_text(encoding="utf-8") == "one"
+    assert os.stat(filename).st_mode & 0o777 == ap.file_mode
+    assert os.listdir(tmp_path / "new") == ["file.txt"]
+
+
+################################################################################
+def test_atomic_file_error(ap, tmp_path):
+    filename = tmp_path / "file.bin"
+    filename.write_bytes(b"old")
+
+    with pytest.raises(RuntimeError):
+        with ap.AtomicFile(str(filename)) as fh:
+            fh.write(b"new")
+            raise RuntimeError()
+
+    assert filename.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["file.bin"]
+
+
+################################################################################
+def test_file_mode(ap):
+    assert ap.file_mode == 0o666 & ~ap.get_umask()
+
+
+################################################################################
+def test_written_files_mode(ap, tmp_path):
+    manifest = ap.Manifest(str(tmp_path))
+    manifest.update("digest", str(tmp_path / "a.htm"))
+    manifest.save()
+
+    writer = ap.FileWriter(jobs=1)
+    writer.write(str(tmp_path / "html" / "a.htm"), "<html></html>")
+    assert writer.flush() == []
+
+    for filename in ("manifest.json", os.path.join("html", "a.htm")):
+        assert os.stat(tmp_path / filename).st_mode & 0o777 == ap.file_mode
+
+
+################################################################################
+def test_watch_processors_output_dir(ap, tmp_path, monkeypatch):
+    # the template dir is found next to the script
+    monkeypatch.setattr(ap.sys, "argv", [ap.__file__])
+    style = ap.Style("*", "#000000", "#ffffff")
+    entries = [ap.Anniversary("birthdays", "Alice", style, 1990, 10, 20)]
+    output_dir = tmp_path / "output"
+
+    processor = ap.WatchProcessor(
+        years=range(2026, 2027),
+        entries=entries,
+        config_dir=str(tmp_path / "etc"),
+        output_dir=str(output_dir),
+        writer=ap.FileWriter(jobs=1),
+    )
+    processor._run_processors(processor.years)
+    processor.writer.flush()
+
+    assert (output_dir / "html" / "2026" / "2026-10.htm").exists()
+    assert list((output_dir / "ical" / "2026").iterdir())
@@ -0,0 +1,119 @@
+"""Tests of the ICAL output: SEQUENCE, the delta files and the snapshot."""
+
+import json
+import zipfile
+
+import pytest
+
+
+################################################################################
+@pytest.fixture
+def run_ical(ap, tmp_path):
+    """Runs an IcalProcessor for 2026 on birthdays given as (name, symbol,
+    (month, day)) – returns the processor."""
+
+    def run(records, **options):
+        entries = [
+            ap.Anniversary(
+                "birthdays", name, ap.Style(symbol, "#000000", "#ffffff"), 1990, *date
+            )
+            for name, symbol, date in records
+        ]
+        options.setdefault("writer", ap.FileWriter(jobs=1))
+        processor = ap.IcalProcessor(
+            years=range(2026, 2027),
+            entries=entries,
+            config_dir=str(tmp_path / "etc"),
+            output_dir=str(tmp_path / "output"),
+            **options,
+        )
+        processor.run()
+
+        return processor
+
+    return run
+
+
+################################################################################
+def read_events(filename):
+    """The events of an ICAL file as dicts of their properties – the first
+    value of each, the reminders come after the event's own."""
+
+    events = []
+    with open(filename, encoding="utf-8") as fh:
+        for line in fh.read().splitlines():
+            if line == "BEGIN:VEVENT":
+                events.append(dict())
+            elif events and ":" in line:
+                key, _, value = line.partition(":")
+                events[-1].setdefault(key, value)
+
+    return events
+
+
+################################################################################
+def test_unchanged(run_ical, tmp_path, capsys):
+    records = [("Alice", "*", (10, 20)), ("Bob", "*", (2, 1))]
+    run_ical(records)
+    capsys.readouterr()
+
+    run_ical(records, delta=True)
+
+    assert "0 added, 0 changed, 0 cancelled" in capsys.readouterr().out
+    delta_dir = tmp_path / "output" / "ical" / "delta"
+    assert read_events(delta_dir / "anniversaries__delta.ics") == []
+    assert read_events(delta_dir / "anniversaries__cancel.ics") == []
+
+
+################################################################################
+def test_changed_summary(run_ical, tmp_path, capsys):
+    run_ical([("Alice", "*", (10, 20))])
+    capsys.readouterr()
+
+    run_ical([("Alice", "+", (10, 20))], delta=True)
+
+    assert "0 added, 1 changed, 0 cancelled" in capsys.readouterr().out
+    ical_dir = tmp_path / "output" / "ical"
+    [event] = read_events(ical_dir / "delta" / "anniversaries__delta.ics")
+    assert event["SEQUENCE"] == "1"
+    assert event["SUMMARY"] == "+ Alice (36)"
+
+    # a full run keeps the sequence of the unchanged event
+    run_ical([("Alice", "+", (10, 20))], force=True)
+    [event] = read_events(ical_dir / "2026" / "anniversaries__2026.ics")
+    assert event["SEQUENCE"] == "1"
+
+
+################################################################################
+def test_changed_date(run_ical, tmp_path, capsys):
+    run_ical([("Alice", "*", (10, 20))])
+    capsys.readouterr()
+
+    run_ical([("Alice", "*", (10, 21))], delta=True)
+
+    assert "1 added, 0 changed, 1 cancelled" in capsys.readouterr().out
+    delta_dir = tmp_path / "output" / "ical" / "delta"
+    [added] = read_events(delta_dir / "anniversaries__delta.ics")
+    [cancelled] = read_events(delta_dir / "anniversaries__cancel.ics")
+    assert added["DTSTART;VALUE=DATE"] == "2026-10-21"
+    assert added["SEQUENCE"] == "0"
+    assert cancelled["DTSTART;VALUE=DATE"] == "2026-10-20"
+    assert cancelled["SEQUENCE"] == "1"
+    assert cancelled["STATUS"] == "CANCELLED"
+    assert cancelled["UID"] != added["UID"]
+
+
+################################################################################
+def test_archive_keeps_snapshot(ap, run_ical, tmp_path):
+    run_ical([("Alice", "*", (10, 20))])
+    snapshot_file = tmp_path / "output" / "ical" / "snapshot.json"
+    snapshot = snapshot_file.read_bytes()
+
+    with ap.Archive(str(tmp_path / "output.zip")) as archive:
+        run_ical([("Alice", "+", (10, 21))], archive=archive, force=True)
+
+    assert snapshot_file.read_bytes() == snapshot
+    with zipfile.ZipFile(tmp_path / "output.zip") as archive:
+        assert archive.namelist() == ["ical/2026/anniversaries__2026.ics"]
+    [event] = json.loads(snapshot)["2026"].values()
+    assert event[2:] == ["2026-10-20", "* Alice (36)"]
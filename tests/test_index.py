@@ -0,0 +1,89 @@
+"""Tests of the indexes: ColumnarIndex has to answer exactly like DateIndex."""
+
+import datetime
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+
+################################################################################
+@pytest.fixture(scope="module")
+def entries(ap):
+    records = [
+        ("birthdays", "Leap", 2000, 2, 29),
+        ("birthdays", "Leap, unknown year", None, 2, 29),
+        ("birthdays", "New year", 1990, 1, 1),
+        ("birthdays", "Year end", None, 12, 31),
+        ("birthdays", "Future", 2025, 6, 15),
+        ("weddings", "Same day 1", 2010, 6, 15),
+        ("weddings", "Same day 2", None, 6, 15),
+        ("to pay", "Rent", None, None, 1),
+        ("to pay", "Monthly 15", 2024, None, 15),
+        ("to pay", "Monthly 29", None, None, 29),
+        ("to pay", "Monthly 31", None, None, 31),
+    ]
+
+    return [
+        ap.Anniversary(section, name, None, year, month, day)
+        for section, name, year, month, day in records
+    ]
+
+
+################################################################################
+@pytest.fixture(scope="module", params=["entries", "empty"])
+def indexes(request, ap, entries):
+    """(DateIndex, ColumnarIndex) of the same anniversaries."""
+
+    index_entries = entries if request.param == "entries" else []
+
+    return ap.DateIndex(index_entries), ap.ColumnarIndex(index_entries)
+
+
+################################################################################
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        # whole years: leap, not leap and several at once
+        ("2024-01-01", "2024-12-31"),
+        ("2023-01-01", "2023-12-31"),
+        ("2020-01-01", "2026-12-31"),
+        # around leap days
+        ("2024-02-28", "2024-03-01"),
+        ("2023-02-28", "2023-03-01"),
+        ("2100-02-01", "2100-02-28"),
+        # across the end of a year, single days
+        ("2024-12-15", "2025-01-15"),
+        ("2024-06-15", "2024-06-15"),
+        ("2024-02-29", "2024-02-29"),
+        # before the first occurrences
+        ("1980-01-01", "1990-01-01"),
+        # reversed windows are empty
+        ("2024-06-20", "2024-06-10"),
+        ("2025-01-01", "2024-01-01"),
+    ],
+)
+def test_occurrences(indexes, start, end):
+    date_index, columnar_index = indexes
+    start = datetime.date.fromisoformat(start)
+    end = datetime.date.fromisoformat(end)
+
+    expected = list(date_index.occurrences(start, end))
+
+    assert list(columnar_index.occurrences(start, end)) == expected
+    if start > end:
+        assert expected == []
+
+
+################################################################################
+@pytest.mark.parametrize("year", [2023, 2024, 2100])
+def test_month_data(indexes, year):
+    date_index, columnar_index = indexes
+
+    for month in range(1, 13):
+        expected = date_index.month_data(year, month)
+        actual = columnar_index.month_data(year, month)
+
+        assert actual == expected
+        # the days in the same order as well
+        assert list(actual) == list(expected)
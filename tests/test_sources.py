@@ -0,0 +1,217 @@
+"""Tests of reading the anniversaries: dates, durations and the source files."""
+
+import datetime
+
+import pytest
+
+
+################################################################################
+@pytest.mark.parametrize(
+    "value, interval, expected",
+    [
+        ("1990-10-20", "yearly", (1990, 10, 20)),
+        ("????-10-20", "yearly", (None, 10, 20)),
+        ("xxxx-10-20", "yearly", (None, 10, 20)),
+        ("2001-02-29", "yearly", (2001, 2, 29)),
+        ("xxxx-02-29", "yearly", (None, 2, 29)),
+        ("xxxx-12-31", "yearly", (None, 12, 31)),
+        ("31", "monthly", (None, None, 31)),
+        ("05", "monthly", (None, None, 5)),
+    ],
+)
+def test_parse_date(ap, value, interval, expected):
+    assert ap.parse_date(value, interval) == expected
+
+
+################################################################################
+@pytest.mark.parametrize(
+    "value, interval",
+    [
+        ("2001-02-30", "yearly"),
+        ("xxxx-04-31", "yearly"),
+        ("xxxx-06-31", "yearly"),
+        ("xxxx-13-01", "yearly"),
+        ("xxxx-00-10", "yearly"),
+        ("xxxx-10-00", "yearly"),
+        ("xxxx-10-32", "yearly"),
+        ("xxxx-10-ab", "yearly"),
+        ("32", "monthly"),
+        ("00", "monthly"),
+    ],
+)
+def test_parse_date_invalid(ap, value, interval):
+    with pytest.raises(ValueError):
+        ap.parse_date(value, interval)
+
+
+################################################################################
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("P1W", datetime.timedelta(weeks=1)),
+        ("-P1W", -datetime.timedelta(weeks=1)),
+        ("P2D", datetime.timedelta(days=2)),
+        ("+P2D", datetime.timedelta(days=2)),
+        ("PT9H30M", datetime.timedelta(hours=9, minutes=30)),
+        ("-PT15M", -datetime.timedelta(minutes=15)),
+        ("PT45S", datetime.timedelta(seconds=45)),
+        ("P1DT12H", datetime.timedelta(days=1, hours=12)),
+    ],
+)
+def test_parse_duration(ap, value, expected):
+    assert ap.parse_duration(value) == expected
+
+
+################################################################################
+@pytest.mark.parametrize(
+    "value", ["", "P", "-P", "PT", "P1DT", "P1W2D", "1D", "P1H", "PT1D", "P1.5D"]
+)
+def test_parse_duration_invalid(ap, value):
+    with pytest.raises(ValueError):
+        ap.parse_duration(value)
+
+
+################################################################################
+def test_parse_durations(ap):
+    assert ap.parse_durations(" -P1D, PT0M ,") == ("-P1D", "PT0M")
+
+    with pytest.raises(ValueError):
+        ap.parse_durations("-P1D,P1DT")
+
+
+################################################################################
+@pytest.mark.parametrize(
+    "value, expected",
+    [
+        ("19901020", "1990-10-20"),
+        ("1990-10-20", "1990-10-20"),
+        ("1990-10-20T10:00:00Z", "1990-10-20"),
+        ("19901020T100000", "1990-10-20"),
+        ("--1020", "????-10-20"),
+        ("--10-20", "????-10-20"),
+    ],
+)
+def test_vcard_date(ap, value, expected):
+    assert ap.vcard_date(value) == expected
+
+
+################################################################################
+@pytest.mark.parametrize("value", ["", "1990", "1020", "1990-10", "19901O20", "--102"])
+def test_vcard_date_invalid(ap, value):
+    with pytest.raises(ValueError):
+        ap.vcard_date(value)
+
+
+################################################################################
+def test_read_csv_records(read_records, tmp_path):
+    records, section_styles, errors = read_records(
+        "friends.csv",
+        "Name;Date;Section;Interval;Symbol;Color;Remind\n"
+        "Alice;1990-10-20;;;;;\n"
+        "Bob;????-02-29;birthdays;yearly;*;#ff0000;-P1D\n"
+        "Rent;01;;monthly;;;\n"
+        "\n"
+        "Carol;2001-02-30;;;;;\n"
+        ";1990-01-01;;;;;\n"
+        "Dave;1990-01-01;;weekly;;;\n"
+        "Eve;1990-01-01;;;*;;P1DT\n",
+    )
+
+    assert records == [
+        ("friends", "Alice", None, 1990, 10, 20),
+        ("birthdays", "Bob", ("*", "#ff0000", "#ffffff", ("-P1D",)), None, 2, 29),
+        ("friends", "Rent", None, None, None, 1),
+    ]
+    assert section_styles == dict()
+    source_file = tmp_path / "friends.csv"
+    assert errors == [
+        "friends/Carol: invalid entry in line 6 of {}".format(source_file),
+        "friends/: invalid entry in line 7 of {}".format(source_file),
+        "friends/Dave: invalid entry in line 8 of {}".format(source_file),
+        "friends/Eve: invalid entry in line 9 of {}".format(source_file),
+    ]
+
+
+################################################################################
+def test_read_csv_records_comma_and_short_rows(read_records):
+    records, _, errors = read_records("people.csv", "date,name\n1990-10-20,Alice\n")
+
+    assert records == [("people", "Alice", None, 1990, 10, 20)]
+    assert errors == []
+
+
+################################################################################
+def test_read_csv_records_requires_columns(read_records):
+    with pytest.raises(ValueError):
+        read_records("people.csv", "name;birthday\nAlice;1990-10-20\n")
+
+
+################################################################################
+def test_read_vcard_records(read_records):
+    records, section_styles, errors = read_records(
+        "contacts.vcf",
+        "BEGIN:VCARD\r\n"
+        "VERSION:3.0\r\n"
+        "FN:Alice Example\r\n"
+        "N:Example;Alice;;;\r\n"
+        "BDAY;VALUE=date:1990-10-20\r\n"
+        "item1.X-ANNIVERSARY:20150601\r\n"
+        "END:VCARD\r\n"
+        "BEGIN:VCARD\r\n"
+        "FN:Bob\r\n"
+        " by\r\n"
+        "BDAY:--0229\r\n"
+        "ANNIVERSARY:2001-02-30\r\n"
+        "END:VCARD\r\n"
+        "BEGIN:VCARD\r\n"
+        "BDAY:19800101\r\n"
+        "END:VCARD\r\n",
+    )
+
+    assert records == [
+        ("birthdays", "Example, Alice", None, 1990, 10, 20),
+        ("weddings", "Example, Alice", None, 2015, 6, 1),
+        ("birthdays", "Bobby", None, None, 2, 29),
+    ]
+    assert section_styles == dict()
+    assert len(errors) == 2
+    assert errors[0].startswith("weddings/Bobby: invalid date 2001-02-30 (")
+    # a card without a name
+    assert " invalid date 19800101 (" in errors[1]
+
+
+################################################################################
+def test_read_cfg_records(read_records):
+    records, section_styles, errors = read_records(
+        "yearly.cfg",
+        "[birthdays]\n"
+        "symbol = *\n"
+        "remind = -P1D, P1DT\n"
+        "Alice = 1990-10-20\n"
+        "Bob = xxxx-04-31\n",
+    )
+
+    style = ("*", "#000000", "#ffffff", None)
+    assert records == [("birthdays", "Alice", style, 1990, 10, 20)]
+    assert section_styles == {"birthdays": style}
+    assert len(errors) == 2
+    assert errors[0].startswith("birthdays/remind: invalid duration: P1DT (")
+    assert errors[1].startswith("birthdays/Bob: invalid date xxxx-04-31 (")
+
+
+################################################################################
+@pytest.mark.parametrize(
+    "value, expected",
+    [("2026", range(2026, 2027)), ("2020..2040", range(2020, 2041))],
+)
+def test_parse_years(ap, value, expected):
+    assert ap.parse_years(value) == expected
+
+
+################################################################################
+@pytest.mark.parametrize(
+    "value", ["", "0", "-1", "10000", "0..2026", "2026..10000", "2026..2020", "x"]
+)
+def test_parse_years_invalid(ap, value):
+    with pytest.raises(ap.argparse.ArgumentTypeError):
+        ap.parse_years(value)